@@ -0,0 +1,220 @@
+"""A minimal in-process MQTT 3.1.1 broker for benchmarks.
+
+This broker is a stand-in for a real MQTT broker such as Mosquitto when you
+want to benchmark Hermes Audio Server on a machine without one. It only
+implements what the audio server and the benchmarks need: CONNECT, PUBLISH
+with QoS 0, 1 and 2, SUBSCRIBE with the + and # wildcards, PINGREQ and
+DISCONNECT. Retained messages, wills, sessions and authentication are not
+supported, and messages are always delivered to subscribers with QoS 0.
+"""
+import socket
+import socketserver
+import struct
+import threading
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def topic_matches(pattern, topic):
+    """Check whether a topic matches a subscription pattern."""
+    pattern_levels = pattern.split('/')
+    topic_levels = topic.split('/')
+    for index, level in enumerate(pattern_levels):
+        if level == '#':
+            return True
+        if index >= len(topic_levels):
+            return False
+        if level not in ('+', topic_levels[index]):
+            return False
+    return len(pattern_levels) == len(topic_levels)
+
+
+def encode_length(length):
+    """Encode the remaining length of an MQTT packet."""
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def packet(packet_type, flags, body):
+    """Build an MQTT packet."""
+    return bytes([packet_type << 4 | flags]) + encode_length(len(body)) + body
+
+
+class Session(socketserver.BaseRequestHandler):
+    """The connection of one client to the broker."""
+
+    def setup(self):
+        self.subscriptions = []
+        self.send_lock = threading.Lock()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.request.makefile('rb')
+
+    def send(self, data):
+        with self.send_lock:
+            self.request.sendall(data)
+
+    def read_packet(self):
+        header = self.reader.read(1)
+        if not header:
+            return None, None, None
+        length = 0
+        multiplier = 1
+        while True:
+            byte = self.reader.read(1)[0]
+            length += (byte & 0x7f) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return header[0] >> 4, header[0] & 0x0f, self.reader.read(length)
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                packet_type, flags, body = self.read_packet()
+                if packet_type is None or packet_type == DISCONNECT:
+                    break
+                if packet_type == CONNECT:
+                    if broker.refuse_connections:
+                        self.send(packet(CONNACK, 0, b'\x00\x03'))
+                        break
+                    broker.add(self)
+                    self.send(packet(CONNACK, 0, b'\x00\x00'))
+                elif packet_type == PUBLISH:
+                    self.handle_publish(flags, body)
+                elif packet_type == PUBREL:
+                    self.send(packet(PUBCOMP, 0, body[:2]))
+                elif packet_type == SUBSCRIBE:
+                    self.handle_subscribe(body)
+                elif packet_type == UNSUBSCRIBE:
+                    self.send(packet(UNSUBACK, 0, body[:2]))
+                elif packet_type == PINGREQ:
+                    self.send(packet(PINGRESP, 0, b''))
+        except (OSError, IndexError):
+            pass
+        finally:
+            broker.remove(self)
+
+    def handle_publish(self, flags, body):
+        qos = (flags >> 1) & 0x03
+        topic_length = struct.unpack('!H', body[:2])[0]
+        topic = body[2:2 + topic_length].decode('utf-8')
+        offset = 2 + topic_length
+        if qos:
+            packet_id = body[offset:offset + 2]
+            offset += 2
+        self.server.broker.route(topic, body[offset:])
+        if qos == 1:
+            self.send(packet(PUBACK, 0, packet_id))
+        elif qos == 2:
+            self.send(packet(PUBREC, 0, packet_id))
+
+    def handle_subscribe(self, body):
+        packet_id = body[:2]
+        offset = 2
+        granted = bytearray()
+        while offset < len(body):
+            length = struct.unpack('!H', body[offset:offset + 2])[0]
+            pattern = body[offset + 2:offset + 2 + length].decode('utf-8')
+            offset += 2 + length + 1
+            self.subscriptions.append(pattern)
+            granted.append(0)
+        self.send(packet(SUBACK, 0, packet_id + bytes(granted)))
+
+    def deliver(self, topic, payload):
+        topic = topic.encode('utf-8')
+        body = struct.pack('!H', len(topic)) + topic + payload
+        try:
+            self.send(packet(PUBLISH, 0, body))
+        except OSError:
+            pass
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Broker:
+    """A minimal MQTT broker running in a background thread.
+
+    Attributes:
+        host (str): The host the broker listens on.
+        port (int): The port the broker listens on.
+        refuse_connections (bool): Refuse new connections if True.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.refuse_connections = False
+        self.sessions = []
+        self.lock = threading.Lock()
+        self.server = Server((host, port), Session)
+        self.server.broker = self
+        self.host, self.port = self.server.server_address
+        self.thread = None
+
+    def start(self):
+        """Start the broker in a background thread."""
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the broker and disconnect all clients."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.disconnect_all()
+
+    def disconnect_all(self):
+        """Disconnect all clients, for instance to simulate an outage."""
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            try:
+                session.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def add(self, session):
+        with self.lock:
+            self.sessions.append(session)
+
+    def remove(self, session):
+        with self.lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+
+    def route(self, topic, payload):
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            if any(topic_matches(pattern, topic)
+                   for pattern in session.subscriptions):
+                session.deliver(topic, payload)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,201 @@
+"""Stand-ins for PyAudio and the paho MQTT client for benchmarks.
+
+These objects have just enough of the interface of :class:`pyaudio.PyAudio`
+and :class:`paho.mqtt.client.Client` to run the audio recorder and audio
+player of Hermes Audio Server without audio hardware or MQTT broker.
+"""
+from collections import Counter
+from pathlib import Path
+import time
+
+from paho.mqtt.client import MQTT_ERR_SUCCESS
+
+SAMPLE_RATES = (8000, 11025, 16000, 22050, 32000, 44100, 48000)
+SAMPLE_SIZES = {1: 4, 2: 4, 4: 3, 8: 2, 16: 1, 32: 1}  # PortAudio formats
+
+
+class NullStream:
+    """An audio stream that discards everything written to it.
+
+    Attributes:
+        realtime (bool): If True, writing blocks as long as it would take to
+            play the audio.
+        on_write (callable): Called with the stream and the data before each
+            write, if not `None`.
+    """
+
+    def __init__(self, format, channels, rate, realtime=False, on_write=None,
+                 **kwargs):
+        # pylint: disable=redefined-builtin,unused-argument
+        self.frame_size = channels * SAMPLE_SIZES[format]
+        self.rate = rate
+        self.realtime = realtime
+        self.on_write = on_write
+        self.frames_written = 0
+
+    def write(self, data, num_frames=None, exception_on_underflow=False):
+        # pylint: disable=unused-argument
+        """Write audio data to the stream."""
+        if self.on_write:
+            self.on_write(self, data)
+        n_frames = len(data) // self.frame_size
+        self.frames_written += n_frames
+        if self.realtime:
+            time.sleep(n_frames / self.rate)
+
+    def stop_stream(self):
+        """Stop the stream."""
+
+    def close(self):
+        """Close the stream."""
+
+
+class FileStream(NullStream):
+    """An audio stream that appends everything written to it to a file."""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.file = Path(path).open('ab')
+
+    def write(self, data, num_frames=None, exception_on_underflow=False):
+        super().write(data, num_frames, exception_on_underflow)
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+
+class FakeAudio:
+    """A stand-in for :class:`pyaudio.PyAudio` with one virtual device that
+    supports all standard sample rates for input and output.
+
+    Attributes:
+        stream_factory (callable): Called with the arguments of :meth:`open`
+            to create an output stream. Defaults to :class:`.NullStream`.
+    """
+
+    def __init__(self, stream_factory=NullStream):
+        self.stream_factory = stream_factory
+
+    @staticmethod
+    def get_device_count():
+        """Return the number of devices."""
+        return 1
+
+    @staticmethod
+    def get_device_info_by_index(index):
+        """Return the information of a device."""
+        return {'index': index,
+                'name': 'benchmark',
+                'hostApi': 0,
+                'maxInputChannels': 2,
+                'maxOutputChannels': 2,
+                'defaultSampleRate': 16000.0}
+
+    def get_default_input_device_info(self):
+        """Return the information of the default input device."""
+        return self.get_device_info_by_index(0)
+
+    def get_default_output_device_info(self):
+        """Return the information of the default output device."""
+        return self.get_device_info_by_index(0)
+
+    @staticmethod
+    def is_format_supported(rate, **kwargs):
+        # pylint: disable=unused-argument
+        """Check whether an audio format is supported."""
+        if rate in SAMPLE_RATES:
+            return True
+        raise ValueError('Invalid sample rate')
+
+    @staticmethod
+    def get_format_from_width(width):
+        """Return the PortAudio format for a sample width."""
+        return {1: 32, 2: 8, 3: 4, 4: 2}[width]
+
+    def open(self, **kwargs):
+        """Open an audio stream."""
+        return self.stream_factory(**kwargs)
+
+    def terminate(self):
+        """Terminate the audio connection."""
+
+
+class PublishInfo:
+    """A stand-in for :class:`paho.mqtt.client.MQTTMessageInfo`."""
+    rc = MQTT_ERR_SUCCESS
+
+    @staticmethod
+    def wait_for_publish(timeout=None):
+        # pylint: disable=unused-argument
+        """Wait until the message is published."""
+
+    @staticmethod
+    def is_published():
+        """Check whether the message is published."""
+        return True
+
+
+class InMemoryClient:
+    """A stand-in for :class:`paho.mqtt.client.Client` that doesn't connect to
+    an MQTT broker but counts the published messages.
+
+    Attributes:
+        messages (:class:`collections.Counter`): The number of published
+            messages per topic.
+        bytes (:class:`collections.Counter`): The number of published bytes
+            per topic.
+        on_publish_message (callable): Called with the topic and payload of
+            each published message, if not `None`.
+    """
+    # pylint: disable=unused-argument
+
+    def __init__(self):
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_publish_message = None
+        self.messages = Counter()
+        self.bytes = Counter()
+
+    def connect(self, *args, **kwargs):
+        """Call the on_connect callback as if the client connected."""
+        if self.on_connect:
+            self.on_connect(self, None, {}, 0)
+
+    def connect_async(self, *args, **kwargs):
+        """Do nothing: call :meth:`connect` to connect."""
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        """Count a published message."""
+        self.messages[topic] += 1
+        self.bytes[topic] += len(payload) if payload else 0
+        if self.on_publish_message:
+            self.on_publish_message(topic, payload)
+        return PublishInfo()
+
+    def username_pw_set(self, *args, **kwargs):
+        """Do nothing."""
+
+    def tls_set(self, *args, **kwargs):
+        """Do nothing."""
+
+    def max_inflight_messages_set(self, *args, **kwargs):
+        """Do nothing."""
+
+    def max_queued_messages_set(self, *args, **kwargs):
+        """Do nothing."""
+
+    def reconnect_delay_set(self, *args, **kwargs):
+        """Do nothing."""
+
+    def subscribe(self, *args, **kwargs):
+        """Do nothing."""
+
+    def message_callback_add(self, *args, **kwargs):
+        """Do nothing."""
+
+    def loop_forever(self, *args, **kwargs):
+        """Do nothing."""
+
+    def disconnect(self, *args, **kwargs):
+        """Do nothing."""
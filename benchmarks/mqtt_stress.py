@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Stress benchmark for the MQTT settings of Hermes Audio Server.
+
+This benchmark publishes audioFrame messages as fast as possible (or at a
+fixed rate) with different combinations of the QoS level and paho's
+max_inflight_messages and max_queued_messages settings, and reports for each
+combination how many frames per second a subscriber receives and how many
+frames are dropped.
+
+By default the benchmark runs against the minimal MQTT broker in broker.py,
+which runs in the same process. Use --host and --port to run it against a
+real broker such as Mosquitto instead:
+
+    python3 benchmarks/mqtt_stress.py --qos 0 1 --inflight 20 100
+    python3 benchmarks/mqtt_stress.py --host localhost --port 1883
+"""
+import argparse
+import io
+import itertools
+import threading
+import time
+import wave
+
+from paho.mqtt.client import Client, MQTT_ERR_SUCCESS
+
+from broker import Broker
+
+AUDIO_FRAME = 'hermes/audioServer/{}/audioFrame'
+CHUNK = 320
+FRAME_RATE = 16000
+SETTLE_TIME = 2
+CONNECT_TIMEOUT = 10
+
+
+def audio_frame():
+    """Return a WAV-encoded audio frame like the ones the recorder sends."""
+    with io.BytesIO() as wav_buffer:
+        with wave.open(wav_buffer, 'wb') as wav:
+            # pylint: disable=no-member
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(FRAME_RATE)
+            wav.writeframes(bytes(2 * CHUNK))
+        return wav_buffer.getvalue()
+
+
+class Counter:
+    """A subscriber counting the messages it receives on a topic."""
+
+    def __init__(self, host, port, topic):
+        self.received = 0
+        self.last = None
+        self.lock = threading.Lock()
+        self.subscribed = threading.Event()
+        self.client = Client()
+        self.client.on_message = self.on_message
+        self.client.on_subscribe = self.on_subscribe
+        self.client.connect(host, port)
+        self.client.subscribe(topic)
+        self.client.loop_start()
+        # Make sure the subscription is active before publishing.
+        if not self.subscribed.wait(CONNECT_TIMEOUT):
+            raise SystemExit('Could not subscribe on the MQTT broker.')
+
+    def on_subscribe(self, client, userdata, mid, granted_qos):
+        self.subscribed.set()
+
+    def on_message(self, client, userdata, message):
+        with self.lock:
+            self.received += 1
+            self.last = time.perf_counter()
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def run(host, port, qos, inflight, queued, duration, rate):
+    """Run the benchmark with one combination of settings.
+
+    Returns:
+        dict: The results of the benchmark.
+    """
+    topic = AUDIO_FRAME.format('benchmark')
+    payload = audio_frame()
+    counter = Counter(host, port, topic)
+
+    connected = threading.Event()
+    publisher = Client()
+    publisher.on_connect = lambda *args: connected.set()
+    publisher.max_inflight_messages_set(inflight)
+    publisher.max_queued_messages_set(queued)
+    publisher.connect(host, port)
+    publisher.loop_start()
+    if not connected.wait(CONNECT_TIMEOUT):
+        raise SystemExit('Could not connect to the MQTT broker.')
+
+    attempted = 0
+    rejected = 0
+    interval = 1 / rate if rate else 0
+    start = time.perf_counter()
+    deadline = start + duration
+    next_frame = start
+    while time.perf_counter() < deadline:
+        if interval:
+            next_frame += interval
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        attempted += 1
+        if publisher.publish(topic, payload, qos).rc != MQTT_ERR_SUCCESS:
+            rejected += 1
+
+    # Wait until no more messages arrive.
+    received = -1
+    while received != counter.received:
+        received = counter.received
+        time.sleep(SETTLE_TIME)
+
+    publisher.loop_stop()
+    publisher.disconnect()
+    counter.stop()
+
+    elapsed = (counter.last or time.perf_counter()) - start
+    return {'qos': qos,
+            'inflight': inflight,
+            'queued': queued,
+            'attempted': attempted,
+            'rejected': rejected,
+            'received': received,
+            'frames_per_second': received / elapsed,
+            'drop_rate': 1 - received / attempted if attempted else 0}
+
+
+def main():
+    """Run the benchmark for all combinations of settings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', help='MQTT broker (default: in-process'
+                                       ' stand-in broker)')
+    parser.add_argument('--port', type=int, default=1883,
+                        help='port of the MQTT broker [default: 1883]')
+    parser.add_argument('--duration', type=float, default=5,
+                        help='seconds to publish for each setting'
+                             ' [default: 5]')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='frames per second to publish, 0 for as fast as'
+                             ' possible [default: 0]')
+    parser.add_argument('--qos', type=int, nargs='+', default=[0, 1, 2],
+                        help='QoS levels [default: 0 1 2]')
+    parser.add_argument('--inflight', type=int, nargs='+', default=[20],
+                        help='max_inflight_messages values [default: 20]')
+    parser.add_argument('--queued', type=int, nargs='+', default=[0],
+                        help='max_queued_messages values [default: 0]')
+    args = parser.parse_args()
+
+    broker = None
+    host, port = args.host, args.port
+    if host is None:
+        broker = Broker().start()
+        host, port = broker.host, broker.port
+
+    print('{:>3} {:>8} {:>7} {:>9} {:>8} {:>9} {:>10} {:>9}'.format(
+        'QoS', 'inflight', 'queued', 'attempted', 'rejected', 'received',
+        'frames/s', 'dropped'))
+    try:
+        for qos, inflight, queued in itertools.product(args.qos,
+                                                       args.inflight,
+                                                       args.queued):
+            result = run(host, port, qos, inflight, queued, args.duration,
+                         args.rate)
+            print('{qos:>3} {inflight:>8} {queued:>7} {attempted:>9}'
+                  ' {rejected:>8} {received:>9} {frames_per_second:>10.1f}'
+                  ' {drop_rate:>9.2%}'.format(**result))
+    finally:
+        if broker:
+            broker.stop()
+
+
+if __name__ == '__main__':
+    main()
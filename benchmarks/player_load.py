@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Load test for the audio player of Hermes Audio Server.
+
+This benchmark runs the audio player with a null audio sink (or a file sink)
+and floods it with playBytes messages of mixed lengths and formats. It reports
+for each message the queueing delay (from publishing the message until the
+player starts handling it), the latency until the first sample is written to
+the audio sink, and the time until the player publishes playFinished, as well
+as the peak memory use of the process. With --chunk the sounds are streamed in
+chunks on the playBytesStreaming topic instead, which shows the effect of the
+jitter buffer on the latency until the first sample. With --sites the player
+plays the sounds of several sites, each on its own (virtual) audio output.
+
+By default the benchmark runs against an in-process MQTT broker. Use --host
+and --port to run it against a real broker such as Mosquitto instead:
+
+    python3 benchmarks/player_load.py --count 200 --rate 20 --realtime
+"""
+import argparse
+from functools import partial
+import io
+import itertools
+import json
+import logging
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+import wave
+
+from paho.mqtt.client import Client
+
+from hermes_audio_server.config import ServerConfig
+from hermes_audio_server.config.audio import AudioConfig, \
+    AudioDeviceConfig
+from hermes_audio_server.config.mqtt import MQTTConfig
+from hermes_audio_server.config.player import PlayerConfig
+from hermes_audio_server.player import AudioPlayer
+
+from broker import Broker
+from fakes import FakeAudio, FileStream, NullStream
+
+PLAY_BYTES = 'hermes/audioServer/{}/playBytes/{}'
+PLAY_BYTES_STREAMING = 'hermes/audioServer/{}/playBytesStreaming/{}/{}/{}'
+PLAY_FINISHED = 'hermes/audioServer/{}/playFinished'
+SITE = 'benchmark'
+CONNECT_TIMEOUT = 10
+
+# Lengths in seconds, sample rates, channels and sample widths of the sounds.
+LENGTHS = (0.2, 0.5, 1, 3)
+FORMATS = ((16000, 1, 2), (22050, 1, 2), (44100, 2, 2), (48000, 2, 2))
+
+
+def wav_file(length, rate, channels, width):
+    """Return a silent WAV file."""
+    with io.BytesIO() as wav_buffer:
+        with wave.open(wav_buffer, 'wb') as wav:
+            # pylint: disable=no-member
+            wav.setnchannels(channels)
+            wav.setsampwidth(width)
+            wav.setframerate(rate)
+            wav.writeframes(bytes(int(length * rate) * channels * width))
+        return wav_buffer.getvalue()
+
+
+def chunks(length, wav_format, chunk_length=None):
+    """Return a silent sound as a list of WAV files of at most chunk_length
+    seconds, or as one WAV file if chunk_length is None."""
+    if not chunk_length:
+        return [wav_file(length, *wav_format)]
+    lengths = [chunk_length] * int(length // chunk_length)
+    if length % chunk_length > 1e-9:
+        lengths.append(length % chunk_length)
+    return [wav_file(chunk, *wav_format) for chunk in lengths]
+
+
+class Subscriptions:
+    """The number of subscriptions the MQTT broker has acknowledged."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.acknowledged = 0
+
+    def on_subscribe(self, client, userdata, mid, granted_qos):
+        # pylint: disable=unused-argument
+        with self.condition:
+            self.acknowledged += 1
+            self.condition.notify_all()
+
+    def wait(self, count, timeout):
+        """Wait until count subscriptions are acknowledged."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.acknowledged >= count, timeout)
+
+
+class Measurements:
+    """The timestamps of each request, keyed by request id."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.published = {}
+        self.handled = {}
+        self.first_sample = {}
+        self.finished = {}
+        # The request that is playing in the current thread
+        self.current = threading.local()
+
+    def record(self, timestamps, request_id):
+        with self.lock:
+            timestamps.setdefault(request_id, time.perf_counter())
+
+    def played(self):
+        """Return the playFinished timestamps of the requests that were
+        played, leaving out the ones the player dropped."""
+        with self.lock:
+            return {request_id: finished
+                    for request_id, finished in self.finished.items()
+                    if request_id in self.first_sample}
+
+    def delays(self, timestamps):
+        """Return the delays since publishing for each request."""
+        with self.lock:
+            return [timestamps[request_id] - published
+                    for request_id, published in self.published.items()
+                    if request_id in timestamps]
+
+
+def create_player(args, measurements, subscriptions, logger):
+    """Create an audio player with a null or file sink, instrumented to record
+    when it handles each request and when its subscriptions are
+    acknowledged."""
+    stream = partial(FileStream, args.sink) if args.sink else NullStream
+
+    def on_write(stream, data):
+        # pylint: disable=unused-argument
+        measurements.record(measurements.first_sample,
+                            measurements.current.request_id)
+
+    outputs = {site: AudioDeviceConfig() for site in sites(args)}
+    config = ServerConfig(site=SITE,
+                          mqtt=MQTTConfig(host=args.host, port=args.port),
+                          audio=AudioConfig(device_cache=None),
+                          player=PlayerConfig(prebuffer=args.prebuffer,
+                                              outputs=outputs))
+    audio = FakeAudio(partial(stream, realtime=args.realtime,
+                              on_write=on_write))
+    player = AudioPlayer(config, False, logger, audio=audio)
+
+    play = player.play
+
+    def instrumented_play(output, playback, *args):
+        measurements.current.request_id = playback.request_id
+        measurements.record(measurements.handled, playback.request_id)
+        play(output, playback, *args)
+
+    # The playback threads are started with the player, so replace it now.
+    player.play = instrumented_play
+    player.mqtt.on_subscribe = subscriptions.on_subscribe
+    threading.Thread(target=player.start, daemon=True).start()
+    return player
+
+
+def sites(args):
+    """Return the site IDs of the audio outputs."""
+    if args.sites == 1:
+        return [SITE]
+    return ['{}-{}'.format(SITE, index) for index in range(args.sites)]
+
+
+def percentiles(values):
+    """Format the median, 95th percentile and maximum of a list of delays."""
+    if not values:
+        return 'no data'
+    values = sorted(values)
+    return 'median {:.1f} ms, p95 {:.1f} ms, max {:.1f} ms'.format(
+        1000 * statistics.median(values),
+        1000 * values[int(0.95 * (len(values) - 1))],
+        1000 * values[-1])
+
+
+def main():
+    """Run the load test and print the measurements."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', help='MQTT broker (default: in-process'
+                                       ' stand-in broker)')
+    parser.add_argument('--port', type=int, default=1883,
+                        help='port of the MQTT broker [default: 1883]')
+    parser.add_argument('--count', type=int, default=100,
+                        help='number of playBytes messages [default: 100]')
+    parser.add_argument('--rate', type=float, default=10,
+                        help='playBytes messages per second [default: 10]')
+    parser.add_argument('--sites', type=int, default=1,
+                        help='number of sites with their own audio output,'
+                             ' which receive the messages in turn'
+                             ' [default: 1]')
+    parser.add_argument('--chunk', type=float,
+                        help='stream the sounds in chunks of this number of'
+                             ' seconds')
+    parser.add_argument('--prebuffer', type=float, default=0.5,
+                        help='seconds of audio to buffer before playing a'
+                             ' streamed sound [default: 0.5]')
+    parser.add_argument('--realtime', action='store_true',
+                        help='let the audio sink take as long as playing the'
+                             ' sound would take')
+    parser.add_argument('--sink', help='append the played audio to this file'
+                                       ' instead of discarding it')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='seconds to wait for playFinished messages'
+                             ' [default: 60]')
+    parser.add_argument('--allocations', action='store_true',
+                        help='trace the peak memory use of Python objects')
+    args = parser.parse_args()
+
+    logging.basicConfig()
+    logger = logging.getLogger('player_load')
+    logger.setLevel(logging.WARNING)
+
+    broker = None
+    if args.host is None:
+        broker = Broker().start()
+        args.host, args.port = broker.host, broker.port
+
+    if args.allocations:
+        tracemalloc.start()
+
+    measurements = Measurements()
+    player_subscriptions = Subscriptions()
+    player = create_player(args, measurements, player_subscriptions, logger)
+
+    def on_play_finished(client, userdata, message):
+        request_id = json.loads(message.payload.decode('utf-8'))['id']
+        measurements.record(measurements.finished, request_id)
+
+    load_subscriptions = Subscriptions()
+    load = Client()
+    load.on_message = on_play_finished
+    load.on_subscribe = load_subscriptions.on_subscribe
+    load.connect(args.host, args.port)
+    for site in sites(args):
+        load.subscribe(PLAY_FINISHED.format(site))
+    load.loop_start()
+
+    # Don't publish anything before the broker has acknowledged the
+    # subscriptions of the player (playBytes and playBytesStreaming for each
+    # site) and of the load client, or the first messages could get lost.
+    if not player_subscriptions.wait(2 * args.sites, CONNECT_TIMEOUT) or \
+       not load_subscriptions.wait(args.sites, CONNECT_TIMEOUT):
+        raise SystemExit('Could not subscribe on the MQTT broker.')
+
+    sounds = [chunks(length, wav_format, args.chunk)
+              for length, wav_format in itertools.product(LENGTHS, FORMATS)]
+    sent_bytes = 0
+    start = time.perf_counter()
+    for index in range(args.count):
+        request_id = 'load-{}'.format(index)
+        sound = sounds[index % len(sounds)]
+        site = sites(args)[index % args.sites]
+        measurements.record(measurements.published, request_id)
+        if args.chunk:
+            for chunk_index, chunk in enumerate(sound):
+                last = int(chunk_index == len(sound) - 1)
+                load.publish(PLAY_BYTES_STREAMING.format(site, request_id,
+                                                         chunk_index, last),
+                             chunk)
+        else:
+            load.publish(PLAY_BYTES.format(site, request_id), sound[0])
+        sent_bytes += sum(len(chunk) for chunk in sound)
+        time.sleep(max(0, start + (index + 1) / args.rate -
+                       time.perf_counter()))
+
+    deadline = time.monotonic() + args.timeout
+    while len(measurements.finished) < args.count and \
+            time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    # The player publishes playFinished right away for the sounds it drops,
+    # so only count the sounds that were written to the audio sink. Stop the
+    # clock at the last of these, so the timeout for lost sounds doesn't
+    # count.
+    played = measurements.played()
+    with measurements.lock:
+        finished = len(measurements.finished)
+    last_finished = max(played.values(), default=start)
+    elapsed = last_finished - start
+
+    print('Messages:          {} ({} bytes)'.format(args.count, sent_bytes))
+    print('Finished:          {}'.format(len(played)))
+    print('Dropped:           {}'.format(finished - len(played)))
+    print('Lost:              {}'.format(args.count - finished))
+    print('Throughput:        {:.1f} messages/s'.format(
+        len(played) / elapsed if elapsed else 0))
+    print('Queueing delay:    {}'.format(
+        percentiles(measurements.delays(measurements.handled))))
+    print('First sample:      {}'.format(
+        percentiles(measurements.delays(measurements.first_sample))))
+    print('playFinished:      {}'.format(
+        percentiles(measurements.delays(played))))
+    print('Peak RSS:          {} KiB'.format(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+    if args.allocations:
+        print('Peak Python memory: {} bytes'.format(
+            tracemalloc.get_traced_memory()[1]))
+        tracemalloc.stop()
+
+    load.loop_stop()
+    player.mqtt.disconnect()
+    if broker:
+        broker.stop()
+
+
+if __name__ == '__main__':
+    main()
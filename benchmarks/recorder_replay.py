@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Replay WAV files through the audio recorder of Hermes Audio Server.
+
+This benchmark feeds the audio frames of one or more WAV files through the
+same Voice Activity Detection, encoding and publishing code as the audio
+recorder uses for a microphone, as fast as possible. It reports the number of
+frames per second, the CPU time per frame, the voice messages that VAD
+detected and the number of bytes published per topic. With --allocations it
+also reports the peak memory use and the places that allocate the most
+memory.
+
+The WAV files should be mono and 16-bit. WAV files with another sample rate
+than 16 kHz are resampled first, like the recorder does for a microphone that
+doesn't support 16 kHz. By default the published messages are counted in
+memory. With --broker they're published on an in-process MQTT broker, which
+adds the cost of paho and the network stack.
+
+    python3 benchmarks/recorder_replay.py --vad 3 --silence 1 corpus/*.wav
+"""
+import argparse
+from collections import Counter
+import logging
+import statistics
+import time
+import tracemalloc
+import wave
+
+from paho.mqtt.client import Client
+
+from hermes_audio_server.config import ServerConfig
+from hermes_audio_server.config.audio import AudioConfig
+from hermes_audio_server.config.mqtt import MQTTConfig
+from hermes_audio_server.config.vad import UtteranceConfig, VADConfig
+from hermes_audio_server.recorder import AudioRecorder, CHANNELS, CHUNK, \
+    FRAME_RATE, SAMPLE_WIDTH
+from hermes_audio_server.resample import Resampler
+
+from broker import Broker
+from fakes import FakeAudio, InMemoryClient
+
+CONNECT_TIMEOUT = 10
+TOP_ALLOCATIONS = 10
+
+
+class CountingClient(Client):
+    """A paho MQTT client that counts the published messages per topic."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = Counter()
+        self.bytes = Counter()
+
+    def publish(self, topic, payload=None, qos=0, retain=False,
+                properties=None):
+        self.messages[topic] += 1
+        self.bytes[topic] += len(payload) if payload else 0
+        return super().publish(topic, payload, qos, retain)
+
+
+def read_frames(filename):
+    """Read the audio frames of a WAV file in chunks of CHUNK samples.
+
+    Returns:
+        list: The chunks of audio frames. An incomplete last chunk is dropped.
+    """
+    with wave.open(filename, 'rb') as wav:
+        if wav.getnchannels() != CHANNELS or \
+           wav.getsampwidth() != SAMPLE_WIDTH:
+            raise SystemExit('{}: only mono, 16-bit WAV files are'
+                             ' supported.'.format(filename))
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if rate != FRAME_RATE:
+        frames = Resampler(rate, FRAME_RATE).process(frames)
+
+    chunk_size = CHUNK * SAMPLE_WIDTH * CHANNELS
+    return [frames[offset:offset + chunk_size]
+            for offset in range(0, len(frames) - chunk_size + 1, chunk_size)]
+
+
+def create_recorder(args, logger):
+    """Create an audio recorder that publishes in memory or on an in-process
+    MQTT broker.
+
+    Returns:
+        tuple: The audio recorder and the broker, or `None`.
+    """
+    if args.vad is None:
+        vad = VADConfig()
+    else:
+        utterance = UtteranceConfig(enabled=args.utterance,
+                                    max_length=args.max_length)
+        vad = VADConfig(enabled=True, mode=args.vad, silence=args.silence,
+                        status_messages=True, utterance=utterance)
+
+    broker = None
+    if args.broker:
+        broker = Broker().start()
+        client = CountingClient()
+        mqtt = MQTTConfig(host=broker.host, port=broker.port)
+    else:
+        client = InMemoryClient()
+        mqtt = MQTTConfig()
+
+    config = ServerConfig(site='benchmark', mqtt=mqtt, vad=vad,
+                          audio=AudioConfig(device_cache=None))
+    recorder = AudioRecorder(config, False, logger, audio=FakeAudio(),
+                             mqtt=client)
+
+    if args.broker:
+        client.loop_start()
+    else:
+        client.connect()
+
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while not recorder.online:
+        if time.monotonic() > deadline:
+            raise SystemExit('Could not connect to the MQTT broker.')
+        time.sleep(0.01)
+
+    return recorder, broker
+
+
+def replay(recorder, files, repeat):
+    """Replay the audio frames of the WAV files through the recorder.
+
+    Returns:
+        dict: The measurements.
+    """
+    durations = []
+    segments = []
+    frame_duration = CHUNK / FRAME_RATE
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(repeat):
+        for filename, chunks in files:
+            speech_start = None
+            for index, frames in enumerate(chunks):
+                start = time.perf_counter()
+                recorder.process_frames(frames)
+                durations.append(time.perf_counter() - start)
+
+                if recorder.in_speech and speech_start is None:
+                    speech_start = index
+                elif not recorder.in_speech and speech_start is not None:
+                    segments.append((filename,
+                                     speech_start * frame_duration,
+                                     index * frame_duration))
+                    speech_start = None
+            if speech_start is not None:
+                segments.append((filename, speech_start * frame_duration,
+                                 None))
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+
+    return {'frames': len(durations),
+            'wall_time': wall_time,
+            'cpu_time': cpu_time,
+            'durations': durations,
+            'segments': segments}
+
+
+def report(result, client):
+    """Print the measurements."""
+    frames = result['frames']
+    durations = sorted(result['durations'])
+    audio_time = frames * CHUNK / FRAME_RATE
+
+    print('Frames:            {}'.format(frames))
+    print('Audio:             {:.1f} s'.format(audio_time))
+    print('Wall time:         {:.3f} s ({:.0f}x realtime)'.format(
+        result['wall_time'], audio_time / result['wall_time']))
+    print('Frames/s:          {:.0f}'.format(frames / result['wall_time']))
+    print('CPU per frame:     {:.1f} us'.format(
+        1e6 * result['cpu_time'] / frames))
+    print('Time per frame:    median {:.1f} us, p99 {:.1f} us,'
+          ' max {:.1f} us'.format(
+              1e6 * statistics.median(durations),
+              1e6 * durations[int(0.99 * (len(durations) - 1))],
+              1e6 * durations[-1]))
+
+    print()
+    print('Voice messages:    {}'.format(len(result['segments'])))
+    for filename, start, end in result['segments']:
+        print('  {}: {:.2f} s - {}'.format(
+            filename, start, 'end' if end is None else '{:.2f} s'.format(end)))
+
+    print()
+    print('Published messages:')
+    for topic in sorted(client.messages):
+        print('  {}: {} messages, {} bytes'.format(topic,
+                                                  client.messages[topic],
+                                                  client.bytes[topic]))
+    print('  Total: {} bytes'.format(sum(client.bytes.values())))
+
+
+def report_allocations(snapshot):
+    """Print the peak memory use and the places that allocate most memory."""
+    current, peak = tracemalloc.get_traced_memory()
+    print()
+    print('Memory:            {} bytes now, {} bytes peak'.format(current,
+                                                                  peak))
+    print('Top allocations:')
+    for statistic in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+        print('  {}'.format(statistic))
+
+
+def main():
+    """Replay the WAV files and print the measurements."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('wav', nargs='+', help='mono 16-bit WAV file')
+    parser.add_argument('--vad', type=int, choices=range(4),
+                        help='enable VAD with this mode [default: disabled]')
+    parser.add_argument('--silence', type=float, default=2,
+                        help='seconds of silence that end a voice message'
+                             ' [default: 2]')
+    parser.add_argument('--utterance', action='store_true',
+                        help='publish complete voice messages')
+    parser.add_argument('--max-length', type=float, default=30,
+                        help='maximum length of a voice message in seconds'
+                             ' [default: 30]')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of times to replay the files'
+                             ' [default: 1]')
+    parser.add_argument('--broker', action='store_true',
+                        help='publish on an in-process MQTT broker')
+    parser.add_argument('--allocations', action='store_true',
+                        help='trace memory allocations (slows down the'
+                             ' replay)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='log the messages of the recorder')
+    args = parser.parse_args()
+
+    logging.basicConfig()
+    logger = logging.getLogger('recorder_replay')
+    logger.setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+
+    files = [(filename, read_frames(filename)) for filename in args.wav]
+    recorder, broker = create_recorder(args, logger)
+
+    if args.allocations:
+        tracemalloc.start()
+    try:
+        result = replay(recorder, files, args.repeat)
+        report(result, recorder.mqtt)
+        if args.allocations:
+            # Leave out the allocations of the benchmark itself.
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, __file__)])
+            report_allocations(snapshot)
+    finally:
+        if args.allocations:
+            tracemalloc.stop()
+        if broker:
+            recorder.mqtt.loop_stop()
+            broker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,8 @@ with Path('requirements.txt').open('r') as fh:
     requirements = [requirement for requirement in requirements
                     if not requirement.startswith('#')]
 
-binaries = [BIN_ROOT + about.PLAYER, BIN_ROOT + about.RECORDER]
+binaries = [BIN_ROOT + about.PLAYER, BIN_ROOT + about.RECORDER,
+            BIN_ROOT + about.CHECKER]
 
 setup(
     name=about.PROJECT,
@@ -8,6 +8,7 @@ LICENSE = 'MIT License'
 GITHUB_URL = 'https://github.com/koenvervloesem/hermes-audio-server'
 DOC_URL = 'https://github.com/koenvervloesem/hermes-audio-server'
 TRACKER_URL = 'https://github.com/koenvervloesem/hermes-audio-server/issues'
+CHECKER = 'hermes-audio-checker'
 PLAYER = 'hermes-audio-player'
 RECORDER = 'hermes-audio-recorder'
 VERSION = '0.3.0-dev'
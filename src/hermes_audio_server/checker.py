@@ -0,0 +1,270 @@
+"""This module contains the main function run by the CLI command
+hermes-audio-checker, which checks the audio frames that Hermes Audio Recorder
+publishes for loss, reordering and latency.
+
+The checker needs the metadata of the audio frames, so enable the `frame_info`
+setting in the configuration of Hermes Audio Recorder.
+"""
+import heapq
+import json
+import math
+import sys
+import time
+
+from paho.mqtt.client import Client
+
+AUDIO_FRAME = 'hermes/audioServer/{}/audioFrame'
+SEQUENCE_WINDOW = 10000
+
+
+class RunningStats:
+    """This class keeps the count, mean, standard deviation, minimum and
+    maximum of a series of values without storing the values, using Welford's
+    algorithm.
+
+    Attributes:
+        count (int): The number of values.
+        mean (float): The mean of the values.
+        minimum (float): The smallest value.
+        maximum (float): The largest value.
+    """
+
+    def __init__(self):
+        """Initialize a :class:`.RunningStats` object."""
+        self.count = 0
+        self.mean = 0.0
+        self.minimum = None
+        self.maximum = None
+        self._m2 = 0.0
+
+    def add(self, value):
+        """Add a value.
+
+        Args:
+            value (float): The value to add.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.minimum = value if self.minimum is None else min(self.minimum,
+                                                              value)
+        self.maximum = value if self.maximum is None else max(self.maximum,
+                                                              value)
+
+    @property
+    def stddev(self):
+        """float: The standard deviation of the values."""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def format_delays(self):
+        """Format the statistics of delays in seconds.
+
+        Returns:
+            str: The mean, standard deviation, minimum and maximum in ms.
+        """
+        if not self.count:
+            return 'no data'
+        return 'mean {:.1f} ms, stddev {:.1f} ms, min {:.1f} ms,' \
+               ' max {:.1f} ms'.format(1000 * self.mean, 1000 * self.stddev,
+                                       1000 * self.minimum,
+                                       1000 * self.maximum)
+
+
+class FrameChecker:
+    """This class collects statistics about the audio frames of a site.
+
+    Audio frames are only counted from the first metadata message on, so
+    they can be compared to the sequence numbers in the metadata.
+
+    The memory use doesn't grow with the duration of the check: duplicates
+    are only detected among the last :data:`SEQUENCE_WINDOW` sequence
+    numbers, and the delays are kept as running statistics. A metadata
+    message that arrives more than :data:`SEQUENCE_WINDOW` sequence numbers
+    late is counted as reordered.
+
+    Attributes:
+        frames (int): The number of received audio frames.
+        infos (int): The number of received metadata messages.
+        invalid (int): The number of metadata messages that couldn't be
+            parsed.
+        duplicates (int): The number of metadata messages with a sequence
+            number that was already received.
+        reordered (int): The number of metadata messages that arrived after a
+            message with a higher sequence number.
+        latencies (:class:`.RunningStats`): The delays in seconds between
+            capturing and receiving each audio frame, based on the clocks of
+            both hosts.
+        transits (:class:`.RunningStats`): The differences in seconds between
+            the receive time and the PortAudio capture time of each audio
+            frame.
+    """
+
+    def __init__(self):
+        """Initialize a :class:`.FrameChecker` object."""
+        self.frames = 0
+        self.infos = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.latencies = RunningStats()
+        self.transits = RunningStats()
+        self._sequences = set()
+        self._window = []
+        self._unique = 0
+        self._first = None
+        self._highest = None
+
+    def frame(self):
+        """Register a received audio frame."""
+        if self._highest is not None:
+            self.frames += 1
+
+    def info(self, message, received):
+        """Register a received metadata message.
+
+        Args:
+            message (dict): The metadata of an audio frame.
+            received (float): The receive time in seconds since the epoch.
+
+        Raises:
+            :exc:`KeyError`: If the message has no sequence number.
+
+            :exc:`TypeError`: If the message isn't a JSON object.
+        """
+        sequence = message['seq']
+        self.infos += 1
+
+        if sequence in self._sequences:
+            self.duplicates += 1
+            return
+        self._unique += 1
+
+        if self._highest is None:
+            self._first = self._highest = sequence
+        elif sequence < self._highest:
+            self.reordered += 1
+            self._first = min(self._first, sequence)
+        else:
+            self._highest = sequence
+        self._remember(sequence)
+
+        if message.get('timestamp') is not None:
+            self.latencies.add(received - message['timestamp'])
+        if message.get('captureTime') is not None:
+            self.transits.add(received - message['captureTime'])
+
+    def _remember(self, sequence):
+        """Remember a sequence number for duplicate detection and forget the
+        sequence numbers that fell out of the window."""
+        oldest = self._highest - SEQUENCE_WINDOW
+        if sequence <= oldest:
+            return
+        self._sequences.add(sequence)
+        heapq.heappush(self._window, sequence)
+        while self._window[0] <= oldest:
+            self._sequences.discard(heapq.heappop(self._window))
+
+    @property
+    def expected(self):
+        """int: The number of audio frames published between the first and the
+        last received audio frame."""
+        if self._highest is None:
+            return 0
+        return self._highest - self._first + 1
+
+    @property
+    def lost(self):
+        """int: The number of audio frames that weren't received."""
+        return max(0, self.expected - self.frames)
+
+    @property
+    def lost_infos(self):
+        """int: The number of metadata messages that weren't received."""
+        return self.expected - self._unique
+
+    def report(self):
+        """Return a report of the statistics.
+
+        Returns:
+            list: A list of strings, one for each line of the report.
+        """
+        lost_rate = 100 * self.lost / self.expected if self.expected else 0
+        # The capture time and receive time are on different clocks, so only
+        # the variation of their difference is meaningful.
+        if self.transits.count:
+            jitter = 'stddev {:.1f} ms, range {:.1f} ms'.format(
+                1000 * self.transits.stddev,
+                1000 * (self.transits.maximum - self.transits.minimum))
+        else:
+            jitter = 'no data'
+        return ['Audio frames:    {} received'.format(self.frames),
+                'Metadata:        {} received, {} duplicates, {} invalid,'
+                ' {} lost'.format(self.infos, self.duplicates, self.invalid,
+                                  self.lost_infos),
+                'Lost:            {} of {} ({:.2f}%)'.format(
+                    self.lost, self.expected, lost_rate),
+                'Reordered:       {}'.format(self.reordered),
+                'Latency:         {}'.format(self.latencies.format_delays()),
+                'Jitter:          {}'.format(jitter)]
+
+
+def main(host, port, site, topic, duration):
+    """The main function run by the CLI command.
+
+    Args:
+        host (str): The host name of the MQTT broker.
+        port (int): The port number of the MQTT broker.
+        site (str): The site ID of Hermes Audio Recorder.
+        topic (str): The MQTT topic for the metadata of the audio frames. The
+            string '{}' is replaced by the site ID.
+        duration (float): Check the audio frames for this number of seconds.
+            If 0, check them until interrupted.
+    """
+    checker = FrameChecker()
+    audio_frame_topic = AUDIO_FRAME.format(site)
+    frame_info_topic = topic.format(site)
+
+    def on_connect(client, userdata, flags, result_code):
+        # pylint: disable=unused-argument
+        client.subscribe([(audio_frame_topic, 0), (frame_info_topic, 0)])
+
+    def on_message(client, userdata, message):
+        # pylint: disable=unused-argument
+        received = time.time()
+        if message.topic == audio_frame_topic:
+            checker.frame()
+            return
+
+        try:
+            checker.info(json.loads(message.payload.decode('utf-8')),
+                         received)
+        except (ValueError, KeyError, TypeError) as error:
+            checker.invalid += 1
+            print('Invalid metadata message on topic {}: {!r}'.format(
+                message.topic, error), file=sys.stderr)
+
+    mqtt = Client()
+    mqtt.on_connect = on_connect
+    mqtt.on_message = on_message
+    mqtt.connect(host, port)
+    mqtt.loop_start()
+
+    print('Checking audio frames of site {} on {}:{}...'.format(site, host,
+                                                                 port))
+    try:
+        if duration:
+            time.sleep(duration)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mqtt.loop_stop()
+        mqtt.disconnect()
+
+    for line in checker.report():
+        print(line)
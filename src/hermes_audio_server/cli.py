@@ -9,17 +9,23 @@ from daemon import DaemonContext
 
 from hermes_audio_server.about import VERSION
 from hermes_audio_server.config import ServerConfig, DEFAULT_CONFIG
-from hermes_audio_server.exceptions import ConfigurationFileNotFoundError, \
-    NoDefaultAudioDeviceError, UnsupportedPlatformError
-from hermes_audio_server.logger import get_logger
+from hermes_audio_server.devices import list_devices as print_devices
+from hermes_audio_server.exceptions import AudioDeviceNotFoundError, \
+    ConfigurationError, ConfigurationFileNotFoundError, \
+    NoDefaultAudioDeviceError, UnsupportedPlatformError, \
+    UnsupportedSampleRateError
+from hermes_audio_server.logger import get_logger, start_logging
 from hermes_audio_server.player import AudioPlayer
+from hermes_audio_server.profiler import SamplingProfiler
 from hermes_audio_server.recorder import AudioRecorder
 
 SERVER = {'hermes-audio-player': AudioPlayer,
           'hermes-audio-recorder': AudioRecorder}
+DEVICES = {'hermes-audio-player': 'output',
+           'hermes-audio-recorder': 'input'}
 
 
-def main(command, verbose, version, config, daemon):
+def main(command, verbose, version, config, daemon, list_devices=False):
     """The main function run by the CLI command.
 
     Args:
@@ -28,6 +34,8 @@ def main(command, verbose, version, config, daemon):
         version (bool): Print version information and exit if True.
         config (str): Configuration file.
         daemon (bool): Run as a daemon if True.
+        list_devices (bool): Print the available audio devices and exit if
+            True.
     """
     # Define signal handler to cleanly exit the program.
     def exit_process(signal_number, frame):
@@ -37,9 +45,22 @@ def main(command, verbose, version, config, daemon):
         server.stop()
         sys.exit(0)
 
+    # Define signal handlers to start and stop the profiler.
+    def start_profiler(signal_number, frame):
+        if profiler:
+            profiler.start()
+
+    def stop_profiler(signal_number, frame):
+        if profiler:
+            profiler.stop()
+
+    profiler = None
+
     # Register signals.
     signal.signal(signal.SIGQUIT, exit_process)
     signal.signal(signal.SIGTERM, exit_process)
+    signal.signal(signal.SIGUSR1, start_profiler)
+    signal.signal(signal.SIGUSR2, stop_profiler)
 
     try:
 
@@ -49,19 +70,40 @@ def main(command, verbose, version, config, daemon):
         # Start the program as a daemon.
         if daemon:
             logger.debug('Starting daemon...')
-            context = DaemonContext(files_preserve=[logger.handlers[0].socket])
+            syslog_handler = logger.handlers[0].handler
+            context = DaemonContext(files_preserve=[syslog_handler.socket])
             context.signal_map = {signal.SIGQUIT: exit_process,
-                                  signal.SIGTERM: exit_process}
+                                  signal.SIGTERM: exit_process,
+                                  signal.SIGUSR1: start_profiler,
+                                  signal.SIGUSR2: stop_profiler}
             context.open()
 
+        # Handle log records in a background thread, so logging doesn't block
+        # the audio threads.
+        start_logging(logger)
+
         if not version:
             if not config:
                 logger.debug('Using default configuration file.')
                 config = DEFAULT_CONFIG
 
+            server_config = ServerConfig.from_json_file(config)
+
+            if list_devices:
+                print_devices(server_config, DEVICES[command])
+                return
+
+            # The profiler is started with SIGUSR1 and stopped with SIGUSR2.
+            # The signal handlers only wake up the profiler thread.
+            profiler = SamplingProfiler(command,
+                                        server_config.profiler.directory,
+                                        server_config.profiler.interval,
+                                        logger)
+            profiler.watch()
+
             server_class = SERVER[command]
             logger.debug('Creating %s object...', server_class.__name__)
-            server = server_class(ServerConfig.from_json_file(config),
+            server = server_class(server_config,
                                   verbose,
                                   logger)
 
@@ -72,6 +114,9 @@ def main(command, verbose, version, config, daemon):
     except JSONDecodeError as error:
         logger.critical('%s is not a valid JSON file. Parsing failed at line %s and column %s. Exiting...', config, error.lineno, error.colno)
         sys.exit(1)
+    except ConfigurationError as error:
+        logger.critical('%s is not a valid configuration file: %s. Exiting...', config, error.message)
+        sys.exit(1)
     except KeyboardInterrupt:
         logger.info('Received SIGINT signal. Shutting down %s...', command)
         server.stop()
@@ -80,6 +125,15 @@ def main(command, verbose, version, config, daemon):
         logger.critical('No default audio %s device available. Exiting...',
                         error.inout)
         sys.exit(1)
+    except AudioDeviceNotFoundError as error:
+        logger.critical('No audio %s device matches %s. Exiting...',
+                        error.inout, error.device)
+        sys.exit(1)
+    except UnsupportedSampleRateError as error:
+        logger.critical('Audio %s device %s doesn\'t support a sample rate of'
+                        ' %s Hz. Exiting...', error.inout, error.device,
+                        error.rate)
+        sys.exit(1)
     except PermissionError as error:
         logger.critical('Can\'t read file %s. Make sure you have read permissions. Exiting...', error.filename)
         sys.exit(1)
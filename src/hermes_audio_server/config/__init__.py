@@ -2,9 +2,17 @@
 import json
 from pathlib import Path
 
+from hermes_audio_server.config.audio import AudioConfig
+from hermes_audio_server.config.frame_info import FrameInfoConfig
+from hermes_audio_server.config.log import LogConfig
 from hermes_audio_server.config.mqtt import MQTTConfig
+from hermes_audio_server.config.player import PlayerConfig
+from hermes_audio_server.config.profiler import ProfilerConfig
+from hermes_audio_server.config.session import LOCAL, SessionConfig
+from hermes_audio_server.config.tap import TapConfig
 from hermes_audio_server.config.vad import VADConfig
-from hermes_audio_server.exceptions import ConfigurationFileNotFoundError
+from hermes_audio_server.exceptions import ConfigurationError, \
+    ConfigurationFileNotFoundError
 
 
 # Default values
@@ -15,6 +23,13 @@ DEFAULT_SITE = 'default'
 SITE = 'site'
 MQTT = 'mqtt'
 VAD = 'vad'
+AUDIO = 'audio'
+LOG = 'log'
+TAP = 'tap'
+FRAME_INFO = 'frame_info'
+SESSION = 'session'
+PROFILER = 'profiler'
+PLAYER = 'player'
 
 
 # TODO: Define __str__() with explicit settings for debugging.
@@ -25,9 +40,24 @@ class ServerConfig:
         site (str): The site ID of the audio server.
         mqtt (:class:`.MQTTConfig`): The MQTT options of the configuration.
         vad (:class:`.VADConfig`): The VAD options of the configuration.
+        audio (:class:`.AudioConfig`): The audio device options of the
+            configuration.
+        log (:class:`.LogConfig`): The logging options of the configuration.
+        tap (:class:`.TapConfig`): The local audio tap options of the
+            configuration.
+        frame_info (:class:`.FrameInfoConfig`): The audio frame metadata
+            options of the configuration.
+        session (:class:`.SessionConfig`): The dialogue session options of
+            the configuration.
+        profiler (:class:`.ProfilerConfig`): The profiler options of the
+            configuration.
+        player (:class:`.PlayerConfig`): The audio player options of the
+            configuration.
     """
 
-    def __init__(self, site='default', mqtt=None, vad=None):
+    def __init__(self, site='default', mqtt=None, vad=None, audio=None,
+                 log=None, tap=None, frame_info=None, session=None,
+                 profiler=None, player=None):
         """Initialize a :class:`.ServerConfig` object.
 
         Args:
@@ -38,6 +68,31 @@ class ServerConfig:
             vad (:class:`.VADConfig`, optional): The VAD settings. Defaults
                 to a default :class:`.VADConfig` object, which disables voice
                 activity detection.
+            audio (:class:`.AudioConfig`, optional): The audio device
+                settings. Defaults to a default :class:`.AudioConfig` object,
+                which uses the default input and output devices.
+            log (:class:`.LogConfig`, optional): The logging settings.
+                Defaults to a default :class:`.LogConfig` object.
+            tap (:class:`.TapConfig`, optional): The local audio tap settings.
+                Defaults to a default :class:`.TapConfig` object, which
+                disables the local audio tap.
+            frame_info (:class:`.FrameInfoConfig`, optional): The audio frame
+                metadata settings. Defaults to a default
+                :class:`.FrameInfoConfig` object, which disables publishing
+                metadata about audio frames.
+            session (:class:`.SessionConfig`, optional): The dialogue session
+                settings. Defaults to a default :class:`.SessionConfig`
+                object, which streams audio regardless of the dialogue
+                session.
+            profiler (:class:`.ProfilerConfig`, optional): The profiler
+                settings. Defaults to a default :class:`.ProfilerConfig`
+                object.
+            player (:class:`.PlayerConfig`, optional): The audio player
+                settings. Defaults to a default :class:`.PlayerConfig` object.
+
+        Raises:
+            :exc:`ConfigurationError`: If the dialogue session settings use
+                the streaming mode 'local' without a local audio tap.
         """
         if mqtt is None:
             self.mqtt = MQTTConfig()
@@ -49,6 +104,45 @@ class ServerConfig:
         else:
             self.vad = vad
 
+        if audio is None:
+            self.audio = AudioConfig()
+        else:
+            self.audio = audio
+
+        if log is None:
+            self.log = LogConfig()
+        else:
+            self.log = log
+
+        if tap is None:
+            self.tap = TapConfig()
+        else:
+            self.tap = tap
+
+        if frame_info is None:
+            self.frame_info = FrameInfoConfig()
+        else:
+            self.frame_info = frame_info
+
+        if session is None:
+            self.session = SessionConfig()
+        else:
+            self.session = session
+
+        if profiler is None:
+            self.profiler = ProfilerConfig()
+        else:
+            self.profiler = profiler
+
+        if player is None:
+            self.player = PlayerConfig()
+        else:
+            self.player = player
+
+        if LOCAL in self.session.modes and not self.tap.enabled:
+            raise ConfigurationError('the streaming mode local needs the'
+                                     ' local audio tap')
+
         self.site = site
 
     @classmethod
@@ -77,6 +171,34 @@ class ServerConfig:
         initialized with the settings from the configuration file, or not
         enabled when not specified.
 
+        The :attr:`audio` attribute of the :class:`.ServerConfig` object is
+        initialized with the settings from the configuration file, or the
+        default input and output devices when not specified.
+
+        The :attr:`log` attribute of the :class:`.ServerConfig` object is
+        initialized with the settings from the configuration file, or the
+        default logging settings when not specified.
+
+        The :attr:`tap` attribute of the :class:`.ServerConfig` object is
+        initialized with the settings from the configuration file, or not
+        enabled when not specified.
+
+        The :attr:`frame_info` attribute of the :class:`.ServerConfig` object
+        is initialized with the settings from the configuration file, or not
+        enabled when not specified.
+
+        The :attr:`session` attribute of the :class:`.ServerConfig` object is
+        initialized with the settings from the configuration file, or not
+        enabled when not specified.
+
+        The :attr:`profiler` attribute of the :class:`.ServerConfig` object
+        is initialized with the settings from the configuration file, or the
+        default profiler settings when not specified.
+
+        The :attr:`player` attribute of the :class:`.ServerConfig` object is
+        initialized with the settings from the configuration file, or the
+        default audio player settings when not specified.
+
         Raises:
             :exc:`ConfigurationFileNotFoundError`: If :attr:`filename` doesn't
                 exist.
@@ -87,6 +209,9 @@ class ServerConfig:
             :exc:`JSONDecodeError`: If :attr:`filename` doesn't have a valid
                 JSON syntax.
 
+            :exc:`ConfigurationError`: If a setting in :attr:`filename` isn't
+                valid.
+
         The JSON file should have the following format:
 
         {
@@ -108,6 +233,45 @@ class ServerConfig:
                 "mode": 0,
                 "silence": 2,
                 "status_messages": true
+            },
+            "audio": {
+                "input": "USB PnP Sound Device: Audio (hw:1,0)",
+                "output": {
+                    "regex": "^bcm2835"
+                },
+                "device_cache": "/var/cache/hermes-audio-server/devices.json"
+            },
+            "log": {
+                "sample_frames": 50,
+                "summary_interval": 10
+            },
+            "tap": {
+                "path": "/run/hermes-audio-server/{}.sock"
+            },
+            "frame_info": {
+                "topic": "hermes/audioServer/{}/audioFrameInfo"
+            },
+            "session": {
+                "hotword": "full",
+                "listening": "full",
+                "idle": "idle"
+            },
+            "profiler": {
+                "directory": "/tmp",
+                "interval": 0.005
+            },
+            "player": {
+                "prebuffer": 0.5,
+                "max_buffer": 30,
+                "outputs": {
+                    "kitchen": "USB PnP Sound Device: Audio (hw:1,0)",
+                    "living-room": {
+                        "regex": "^bcm2835"
+                    }
+                },
+                "groups": {
+                    "downstairs": ["kitchen", "living-room"]
+                }
             }
         }
         """
@@ -122,4 +286,14 @@ class ServerConfig:
 
         return cls(site=configuration.get(SITE, DEFAULT_SITE),
                    mqtt=MQTTConfig.from_json(configuration.get(MQTT)),
-                   vad=VADConfig.from_json(configuration.get(VAD)))
+                   vad=VADConfig.from_json(configuration.get(VAD)),
+                   audio=AudioConfig.from_json(configuration.get(AUDIO)),
+                   log=LogConfig.from_json(configuration.get(LOG)),
+                   tap=TapConfig.from_json(configuration.get(TAP)),
+                   frame_info=FrameInfoConfig.from_json(
+                       configuration.get(FRAME_INFO)),
+                   session=SessionConfig.from_json(
+                       configuration.get(SESSION)),
+                   profiler=ProfilerConfig.from_json(
+                       configuration.get(PROFILER)),
+                   player=PlayerConfig.from_json(configuration.get(PLAYER)))
@@ -0,0 +1,210 @@
+"""Classes for the audio device configuration of hermes-audio-server."""
+import re
+
+from hermes_audio_server.exceptions import ConfigurationError
+
+# Default values
+DEFAULT_DEVICE_CACHE = '/var/cache/hermes-audio-server/devices.json'
+
+# Keys in the JSON configuration file
+INPUT = 'input'
+OUTPUT = 'output'
+DEVICE_CACHE = 'device_cache'
+INDEX = 'index'
+NAME = 'name'
+REGEX = 'regex'
+
+
+class AudioDeviceConfig:
+    """This class represents the selection of an audio device.
+
+    Attributes:
+        index (int): The PortAudio index of the device. `None` if the device
+            isn't selected by index.
+        name (str): The exact name of the device. `None` if the device isn't
+            selected by name.
+        regex (str): A regular expression matching the name of the device.
+            `None` if the device isn't selected by a regular expression.
+    """
+
+    def __init__(self, index=None, name=None, regex=None):
+        """Initialize a :class:`.AudioDeviceConfig` object.
+
+        Args:
+            index (int, optional): The PortAudio index of the device.
+            name (str, optional): The exact name of the device.
+            regex (str, optional): A regular expression matching the name of
+                the device.
+
+        All arguments are optional. If none of them is specified, the default
+        device of the system is used.
+
+        Raises:
+            :exc:`ConfigurationError`: If :attr:`regex` isn't a valid regular
+                expression.
+        """
+        if regex is not None:
+            try:
+                re.compile(regex)
+            except re.error as error:
+                raise ConfigurationError('invalid regular expression {} for'
+                                         ' audio device: {}'.format(regex,
+                                                                    error))
+
+        self.index = index
+        self.name = name
+        self.regex = regex
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.AudioDeviceConfig` object with settings from
+        a JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the device selection.
+                This can be an integer (the device index), a string (the exact
+                device name) or an object. Defaults to `None`, which selects
+                the default device.
+
+        Returns:
+            :class:`.AudioDeviceConfig`: An object with the device selection.
+
+        Raises:
+            :exc:`ConfigurationError`: If the JSON object isn't a valid device
+                selection.
+
+        The JSON object should have one of the following formats:
+
+        2
+
+        "USB PnP Sound Device: Audio (hw:1,0)"
+
+        {
+            "regex": "^USB PnP"
+        }
+        """
+        if json_object is None:
+            ret = cls()
+        elif isinstance(json_object, bool):
+            raise ConfigurationError('invalid audio device:'
+                                     ' {}'.format(json_object))
+        elif isinstance(json_object, int):
+            ret = cls(index=json_object)
+        elif isinstance(json_object, str):
+            ret = cls(name=json_object)
+        else:
+            ret = cls(index=json_object.get(INDEX),
+                      name=json_object.get(NAME),
+                      regex=json_object.get(REGEX))
+
+        return ret
+
+    @property
+    def default(self):
+        """Check whether the default device of the system is selected.
+
+        Returns:
+            bool: True if no index, name or regular expression is specified.
+        """
+        return self.index is None and self.name is None and self.regex is None
+
+    def matches(self, device):
+        """Check whether a device matches this selection.
+
+        Args:
+            device (dict): The device information, with at least the keys
+                'index' and 'name'.
+
+        Returns:
+            bool: True if the device matches all specified criteria.
+        """
+        if self.index is not None and device['index'] != self.index:
+            return False
+        if self.name is not None and device['name'] != self.name:
+            return False
+        if self.regex is not None and not re.search(self.regex, device['name']):
+            return False
+
+        return True
+
+    def __str__(self):
+        if self.index is not None:
+            return 'index {}'.format(self.index)
+        if self.name is not None:
+            return 'name "{}"'.format(self.name)
+        if self.regex is not None:
+            return 'regex "{}"'.format(self.regex)
+        return 'default device'
+
+
+class AudioConfig:
+    """This class represents the audio device settings of a Hermes audio
+    server.
+
+    Attributes:
+        input (:class:`.AudioDeviceConfig`): The selected input device.
+        output (:class:`.AudioDeviceConfig`): The selected output device.
+        device_cache (str): Path to the file where the list of audio devices
+            is cached. `None` if the list isn't cached.
+    """
+
+    def __init__(self, input=None, output=None,
+                 device_cache=DEFAULT_DEVICE_CACHE):
+        # pylint: disable=redefined-builtin
+        """Initialize a :class:`.AudioConfig` object.
+
+        Args:
+            input (:class:`.AudioDeviceConfig`, optional): The selected input
+                device. Defaults to the default input device.
+            output (:class:`.AudioDeviceConfig`, optional): The selected output
+                device. Defaults to the default output device.
+            device_cache (str, optional): Path to the file where the list of
+                audio devices is cached. Defaults to
+                '/var/cache/hermes-audio-server/devices.json'.
+
+        All arguments are optional.
+        """
+        if input is None:
+            self.input = AudioDeviceConfig()
+        else:
+            self.input = input
+
+        if output is None:
+            self.output = AudioDeviceConfig()
+        else:
+            self.output = output
+
+        self.device_cache = device_cache
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.AudioConfig` object with settings from a JSON
+        object.
+
+        Args:
+            json_object (optional): The JSON object with the audio settings.
+                Defaults to {}.
+
+        Returns:
+            :class:`.AudioConfig`: An object with the audio settings.
+
+        The JSON object should have the following format:
+
+        {
+            "input": "USB PnP Sound Device: Audio (hw:1,0)",
+            "output": {
+                "regex": "^bcm2835"
+            },
+            "device_cache": "/var/cache/hermes-audio-server/devices.json"
+        }
+
+        Set "device_cache" to `null` to disable caching the list of audio
+        devices.
+        """
+        if json_object is None:
+            json_object = {}
+
+        return cls(input=AudioDeviceConfig.from_json(json_object.get(INPUT)),
+                   output=AudioDeviceConfig.from_json(json_object.get(OUTPUT)),
+                   device_cache=json_object.get(DEVICE_CACHE,
+                                                DEFAULT_DEVICE_CACHE))
@@ -0,0 +1,60 @@
+"""Class for the audio frame metadata configuration of hermes-audio-server."""
+
+# Default values
+DEFAULT_TOPIC = 'hermes/audioServer/{}/audioFrameInfo'
+
+# Keys in the JSON configuration file
+TOPIC = 'topic'
+
+
+class FrameInfoConfig:
+    """This class represents the settings for publishing metadata about the
+    audio frames of Hermes Audio Recorder.
+
+    Attributes:
+        enabled (bool): Whether or not Hermes Audio Recorder publishes
+            metadata about each audio frame.
+        topic (str): The MQTT topic for the metadata. The string '{}' is
+            replaced by the site ID.
+    """
+
+    def __init__(self, enabled=False, topic=DEFAULT_TOPIC):
+        """Initialize a :class:`.FrameInfoConfig` object.
+
+        Args:
+            enabled (bool): Whether or not Hermes Audio Recorder publishes
+                metadata about each audio frame. Defaults to False.
+            topic (str): The MQTT topic for the metadata. Defaults to
+                'hermes/audioServer/{}/audioFrameInfo'.
+
+        All arguments are optional.
+        """
+        self.enabled = enabled
+        self.topic = topic
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.FrameInfoConfig` object with settings from a
+        JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the audio frame
+                metadata settings. Defaults to {}.
+
+        Returns:
+            :class:`.FrameInfoConfig`: An object with the audio frame metadata
+            settings.
+
+        The JSON object should have the following format:
+
+        {
+            "topic": "hermes/audioServer/{}/audioFrameInfo"
+        }
+        """
+        if json_object is None:
+            ret = cls(enabled=False)
+        else:
+            ret = cls(enabled=True,
+                      topic=json_object.get(TOPIC, DEFAULT_TOPIC))
+
+        return ret
@@ -0,0 +1,74 @@
+"""Class for the logging configuration of hermes-audio-server."""
+from hermes_audio_server.exceptions import ConfigurationError
+
+# Default values
+DEFAULT_SAMPLE_FRAMES = 0
+DEFAULT_SUMMARY_INTERVAL = 10
+
+# Keys in the JSON configuration file
+SAMPLE_FRAMES = 'sample_frames'
+SUMMARY_INTERVAL = 'summary_interval'
+
+
+class LogConfig:
+    """This class represents the logging settings of a Hermes audio server.
+
+    These settings only matter in verbose mode.
+
+    Attributes:
+        sample_frames (int): Log a debug message for every Nth published audio
+            frame. 0 disables these messages.
+        summary_interval (int): Log a summary of the published audio frames
+            every this number of seconds. 0 disables the summary.
+    """
+
+    def __init__(self, sample_frames=DEFAULT_SAMPLE_FRAMES,
+                 summary_interval=DEFAULT_SUMMARY_INTERVAL):
+        """Initialize a :class:`.LogConfig` object.
+
+        Args:
+            sample_frames (int, optional): Log a debug message for every Nth
+                published audio frame. Defaults to 0, which disables these
+                messages.
+            summary_interval (int, optional): Log a summary of the published
+                audio frames every this number of seconds. Defaults to 10.
+
+        All arguments are optional.
+
+        Raises:
+            :exc:`ConfigurationError`: If one of the settings is negative.
+        """
+        for value in (sample_frames, summary_interval):
+            if value < 0:
+                raise ConfigurationError('invalid logging setting'
+                                         ' {}'.format(value))
+
+        self.sample_frames = sample_frames
+        self.summary_interval = summary_interval
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.LogConfig` object with settings from a JSON
+        object.
+
+        Args:
+            json_object (optional): The JSON object with the logging settings.
+                Defaults to {}.
+
+        Returns:
+            :class:`.LogConfig`: An object with the logging settings.
+
+        The JSON object should have the following format:
+
+        {
+            "sample_frames": 50,
+            "summary_interval": 10
+        }
+        """
+        if json_object is None:
+            json_object = {}
+
+        return cls(sample_frames=json_object.get(SAMPLE_FRAMES,
+                                                 DEFAULT_SAMPLE_FRAMES),
+                   summary_interval=json_object.get(SUMMARY_INTERVAL,
+                                                    DEFAULT_SUMMARY_INTERVAL))
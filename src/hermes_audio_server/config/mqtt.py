@@ -1,8 +1,19 @@
 """Classes for the configuration of hermes-audio-server."""
+from hermes_audio_server.exceptions import ConfigurationError
 
 # Default values
 DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 1883
+DEFAULT_MIN_DELAY = 1
+DEFAULT_MAX_DELAY = 120
+DEFAULT_MAX_BYTES = 1048576
+DEFAULT_OVERFLOW = 'drop_oldest'
+DEFAULT_SPOOL_MAX_BYTES = 10485760
+DEFAULT_SPOOL_MAX_AGE = 300
+DEFAULT_QOS = 0
+DEFAULT_MAX_INFLIGHT_MESSAGES = 20
+DEFAULT_MAX_QUEUED_MESSAGES = 0
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
 
 # Keys in the JSON configuration file
 HOST = 'host'
@@ -14,6 +25,21 @@ TLS = 'tls'
 CA_CERTS = 'ca_certificates'
 CLIENT_CERT = 'client_certificate'
 CLIENT_KEY = 'client_key'
+RECONNECT = 'reconnect'
+MIN_DELAY = 'min_delay'
+MAX_DELAY = 'max_delay'
+QUEUE = 'queue'
+MAX_BYTES = 'max_bytes'
+OVERFLOW = 'overflow'
+SPOOL = 'spool'
+SPOOL_MAX_BYTES = 'spool_max_bytes'
+SPOOL_MAX_AGE = 'spool_max_age'
+QOS = 'qos'
+AUDIO_FRAMES = 'audio_frames'
+STATUS = 'status'
+PLAY_BYTES = 'play_bytes'
+MAX_INFLIGHT_MESSAGES = 'max_inflight_messages'
+MAX_QUEUED_MESSAGES = 'max_queued_messages'
 
 
 # TODO: Define __str__() for each class with explicit settings for debugging.
@@ -146,6 +172,224 @@ class MQTTTLSConfig:
         return ret
 
 
+class MQTTReconnectConfig:
+    """This class represents the settings for reconnecting to an MQTT broker.
+
+    Attributes:
+        min_delay (int): The delay in seconds before the first attempt to
+            reconnect.
+        max_delay (int): The maximum delay in seconds between two attempts to
+            reconnect. The delay doubles after each failed attempt until it
+            reaches this value.
+    """
+
+    def __init__(self, min_delay=DEFAULT_MIN_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY):
+        """Initialize a :class:`.MQTTReconnectConfig` object.
+
+        Args:
+            min_delay (int, optional): The delay in seconds before the first
+                attempt to reconnect. Defaults to 1.
+            max_delay (int, optional): The maximum delay in seconds between two
+                attempts to reconnect. Defaults to 120.
+
+        All arguments are optional.
+
+        Raises:
+            :exc:`ConfigurationError`: If :attr:`min_delay` isn't positive or
+                is larger than :attr:`max_delay`.
+        """
+        if min_delay <= 0 or min_delay > max_delay:
+            raise ConfigurationError('invalid reconnect delays {} and'
+                                     ' {}'.format(min_delay, max_delay))
+
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.MQTTReconnectConfig` object with settings
+        from a JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the reconnection
+                settings. Defaults to {}.
+
+        Returns:
+            :class:`.MQTTReconnectConfig`: An object with the reconnection
+            settings.
+
+        The JSON object should have the following format:
+
+        {
+            "min_delay": 1,
+            "max_delay": 120
+        }
+        """
+        if json_object is None:
+            json_object = {}
+
+        return cls(min_delay=json_object.get(MIN_DELAY, DEFAULT_MIN_DELAY),
+                   max_delay=json_object.get(MAX_DELAY, DEFAULT_MAX_DELAY))
+
+
+class MQTTQueueConfig:
+    """This class represents the settings for the queue of messages that are
+    published while the connection to the MQTT broker is down.
+
+    Attributes:
+        max_bytes (int): The maximum size in bytes of the messages in the
+            in-memory queue.
+        overflow (str): What to do when the in-memory queue is full:
+            'drop_oldest' or 'drop_newest'.
+        spool (str): Path to a file where audio frames of voice messages are
+            spooled while the connection is down. `None` if these are put in
+            the in-memory queue too.
+        spool_max_bytes (int): The maximum size in bytes of the spool file.
+        spool_max_age (int): The maximum age in seconds of the messages in
+            the spool file that are still published.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, overflow=DEFAULT_OVERFLOW,
+                 spool=None, spool_max_bytes=DEFAULT_SPOOL_MAX_BYTES,
+                 spool_max_age=DEFAULT_SPOOL_MAX_AGE):
+        """Initialize a :class:`.MQTTQueueConfig` object.
+
+        Args:
+            max_bytes (int, optional): The maximum size in bytes of the
+                messages in the in-memory queue. Defaults to 1 MiB.
+            overflow (str, optional): What to do when the in-memory queue is
+                full: 'drop_oldest' or 'drop_newest'. Defaults to
+                'drop_oldest'.
+            spool (str, optional): Path to a file where audio frames of voice
+                messages are spooled while the connection is down. Defaults to
+                `None`, which disables the spool file.
+            spool_max_bytes (int, optional): The maximum size in bytes of the
+                spool file. Defaults to 10 MiB.
+            spool_max_age (int, optional): The maximum age in seconds of the
+                messages in the spool file that are still published. Defaults
+                to 300.
+
+        All arguments are optional.
+
+        Raises:
+            :exc:`ConfigurationError`: If :attr:`overflow` isn't a known
+                policy or one of the limits isn't positive.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ConfigurationError('unknown overflow policy'
+                                     ' {}'.format(overflow))
+        for limit in (max_bytes, spool_max_bytes, spool_max_age):
+            if limit <= 0:
+                raise ConfigurationError('invalid queue limit'
+                                         ' {}'.format(limit))
+
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.spool = spool
+        self.spool_max_bytes = spool_max_bytes
+        self.spool_max_age = spool_max_age
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.MQTTQueueConfig` object with settings from a
+        JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the queue settings.
+                Defaults to {}.
+
+        Returns:
+            :class:`.MQTTQueueConfig`: An object with the queue settings.
+
+        The JSON object should have the following format:
+
+        {
+            "max_bytes": 1048576,
+            "overflow": "drop_oldest",
+            "spool": "/var/spool/hermes-audio-server/audio.spool",
+            "spool_max_bytes": 10485760,
+            "spool_max_age": 300
+        }
+        """
+        if json_object is None:
+            json_object = {}
+
+        return cls(max_bytes=json_object.get(MAX_BYTES, DEFAULT_MAX_BYTES),
+                   overflow=json_object.get(OVERFLOW, DEFAULT_OVERFLOW),
+                   spool=json_object.get(SPOOL),
+                   spool_max_bytes=json_object.get(SPOOL_MAX_BYTES,
+                                                   DEFAULT_SPOOL_MAX_BYTES),
+                   spool_max_age=json_object.get(SPOOL_MAX_AGE,
+                                                 DEFAULT_SPOOL_MAX_AGE))
+
+
+class MQTTQoSConfig:
+    """This class represents the QoS levels of the MQTT topics used by Hermes
+    Audio Server.
+
+    Attributes:
+        audio_frames (int): The QoS level of audioFrame messages.
+        status (int): The QoS level of playFinished, vadUp and vadDown
+            messages.
+        play_bytes (int): The QoS level of the subscription to playBytes
+            messages.
+    """
+
+    def __init__(self, audio_frames=DEFAULT_QOS, status=DEFAULT_QOS,
+                 play_bytes=DEFAULT_QOS):
+        """Initialize a :class:`.MQTTQoSConfig` object.
+
+        Args:
+            audio_frames (int, optional): The QoS level of audioFrame messages.
+                Defaults to 0.
+            status (int, optional): The QoS level of playFinished, vadUp and
+                vadDown messages. Defaults to 0.
+            play_bytes (int, optional): The QoS level of the subscription to
+                playBytes messages. Defaults to 0.
+
+        All arguments are optional.
+
+        Raises:
+            :exc:`ConfigurationError`: If one of the QoS levels isn't 0, 1 or
+                2.
+        """
+        for qos in (audio_frames, status, play_bytes):
+            if qos not in (0, 1, 2):
+                raise ConfigurationError('invalid QoS level {}'.format(qos))
+
+        self.audio_frames = audio_frames
+        self.status = status
+        self.play_bytes = play_bytes
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.MQTTQoSConfig` object with settings from a
+        JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the QoS levels.
+                Defaults to {}.
+
+        Returns:
+            :class:`.MQTTQoSConfig`: An object with the QoS levels.
+
+        The JSON object should have the following format:
+
+        {
+            "audio_frames": 0,
+            "status": 1,
+            "play_bytes": 1
+        }
+        """
+        if json_object is None:
+            json_object = {}
+
+        return cls(audio_frames=json_object.get(AUDIO_FRAMES, DEFAULT_QOS),
+                   status=json_object.get(STATUS, DEFAULT_QOS),
+                   play_bytes=json_object.get(PLAY_BYTES, DEFAULT_QOS))
+
+
 class MQTTConfig:
     """This class represents the configuration for a connection to an
     MQTT broker.
@@ -157,10 +401,21 @@ class MQTTConfig:
             settings (username and password) for the MQTT broker.
         tls (:class:`.MQTTTLSConfig`, optional): The TLS settings for the MQTT
             broker.
+        reconnect (:class:`.MQTTReconnectConfig`): The settings for
+            reconnecting to the MQTT broker.
+        queue (:class:`.MQTTQueueConfig`): The settings for the queue of
+            messages published while the connection is down.
+        qos (:class:`.MQTTQoSConfig`): The QoS levels of the MQTT topics.
+        max_inflight_messages (int): The maximum number of messages with QoS
+            level 1 or 2 that can be in the process of being sent at once.
+        max_queued_messages (int): The maximum number of messages with QoS
+            level 1 or 2 that are queued to be sent. 0 means unlimited.
     """
 
     def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, auth=None,
-                 tls=None):
+                 tls=None, reconnect=None, queue=None, qos=None,
+                 max_inflight_messages=DEFAULT_MAX_INFLIGHT_MESSAGES,
+                 max_queued_messages=DEFAULT_MAX_QUEUED_MESSAGES):
         """Initialize a :class:`.MQTTConfig` object.
 
         Args:
@@ -173,6 +428,21 @@ class MQTTConfig:
             tls (:class:`.MQTTTLSConfig`, optional): The TLS settings for the
                 MQTT broker. Defaults to a default :class:`.MQTTTLSConfig`
                 object.
+            reconnect (:class:`.MQTTReconnectConfig`, optional): The settings
+                for reconnecting to the MQTT broker. Defaults to a default
+                :class:`.MQTTReconnectConfig` object.
+            queue (:class:`.MQTTQueueConfig`, optional): The settings for the
+                queue of messages published while the connection is down.
+                Defaults to a default :class:`.MQTTQueueConfig` object.
+            qos (:class:`.MQTTQoSConfig`, optional): The QoS levels of the
+                MQTT topics. Defaults to a default :class:`.MQTTQoSConfig`
+                object.
+            max_inflight_messages (int, optional): The maximum number of
+                messages with QoS level 1 or 2 that can be in the process of
+                being sent at once. Defaults to 20.
+            max_queued_messages (int, optional): The maximum number of
+                messages with QoS level 1 or 2 that are queued to be sent.
+                Defaults to 0 (unlimited).
 
         All arguments are optional.
         """
@@ -189,6 +459,24 @@ class MQTTConfig:
         else:
             self.tls = tls
 
+        if reconnect is None:
+            self.reconnect = MQTTReconnectConfig()
+        else:
+            self.reconnect = reconnect
+
+        if queue is None:
+            self.queue = MQTTQueueConfig()
+        else:
+            self.queue = queue
+
+        if qos is None:
+            self.qos = MQTTQoSConfig()
+        else:
+            self.qos = qos
+
+        self.max_inflight_messages = max_inflight_messages
+        self.max_queued_messages = max_queued_messages
+
     @classmethod
     def from_json(cls, json_object=None):
         """Initialize a :class:`.MQTTConfig` object with settings from a JSON
@@ -214,7 +502,25 @@ class MQTTConfig:
                 "ca_certificates": "",
                 "client_certificate": "",
                 "client_key": ""
-            }
+            },
+            "reconnect": {
+                "min_delay": 1,
+                "max_delay": 120
+            },
+            "queue": {
+                "max_bytes": 1048576,
+                "overflow": "drop_oldest",
+                "spool": "/var/spool/hermes-audio-server/audio.spool",
+                "spool_max_bytes": 10485760,
+                "spool_max_age": 300
+            },
+            "qos": {
+                "audio_frames": 0,
+                "status": 1,
+                "play_bytes": 1
+            },
+            "max_inflight_messages": 20,
+            "max_queued_messages": 0
         }
         """
         if json_object is None:
@@ -223,4 +529,12 @@ class MQTTConfig:
         return cls(host=json_object.get(HOST, DEFAULT_HOST),
                    port=json_object.get(PORT, DEFAULT_PORT),
                    auth=MQTTAuthConfig.from_json(json_object.get(AUTH)),
-                   tls=MQTTTLSConfig.from_json(json_object.get(TLS)))
+                   tls=MQTTTLSConfig.from_json(json_object.get(TLS)),
+                   reconnect=MQTTReconnectConfig.from_json(
+                       json_object.get(RECONNECT)),
+                   queue=MQTTQueueConfig.from_json(json_object.get(QUEUE)),
+                   qos=MQTTQoSConfig.from_json(json_object.get(QOS)),
+                   max_inflight_messages=json_object.get(
+                       MAX_INFLIGHT_MESSAGES, DEFAULT_MAX_INFLIGHT_MESSAGES),
+                   max_queued_messages=json_object.get(
+                       MAX_QUEUED_MESSAGES, DEFAULT_MAX_QUEUED_MESSAGES))
@@ -0,0 +1,115 @@
+"""Class for the audio player configuration of hermes-audio-server."""
+from hermes_audio_server.config.audio import AudioDeviceConfig
+from hermes_audio_server.exceptions import ConfigurationError
+
+# Default values
+DEFAULT_PREBUFFER = 0.5
+DEFAULT_MAX_BUFFER = 30
+
+# Keys in the JSON configuration file
+PREBUFFER = 'prebuffer'
+MAX_BUFFER = 'max_buffer'
+OUTPUTS = 'outputs'
+GROUPS = 'groups'
+
+
+class PlayerConfig:
+    """This class represents the settings of Hermes Audio Player for sounds
+    that are streamed in chunks and for playing sounds of several sites.
+
+    Attributes:
+        prebuffer (float): The number of seconds of audio to buffer before
+            playback starts.
+        max_buffer (float): The maximum number of seconds of audio in the
+            buffer.
+        outputs (dict): The audio output device for each site ID, as
+            :class:`.AudioDeviceConfig` objects. If empty, only the site of
+            the audio server is played on the output device of the audio
+            configuration.
+        groups (dict): The site IDs of the outputs in each group, by the site
+            ID of the group.
+    """
+
+    def __init__(self, prebuffer=DEFAULT_PREBUFFER,
+                 max_buffer=DEFAULT_MAX_BUFFER, outputs=None, groups=None):
+        """Initialize a :class:`.PlayerConfig` object.
+
+        Args:
+            prebuffer (float, optional): The number of seconds of audio to
+                buffer before playback starts. Defaults to 0.5.
+            max_buffer (float, optional): The maximum number of seconds of
+                audio in the buffer. Defaults to 30.
+            outputs (dict, optional): The audio output device for each site
+                ID, as :class:`.AudioDeviceConfig` objects. Defaults to {}.
+            groups (dict, optional): The site IDs of the outputs in each
+                group, by the site ID of the group. Defaults to {}.
+
+        Raises:
+            :exc:`ConfigurationError`: If :attr:`prebuffer` is negative or
+                larger than :attr:`max_buffer`, or if a group has the site ID
+                of an output or contains a site ID that isn't an output.
+        """
+        if prebuffer < 0 or prebuffer > max_buffer:
+            raise ConfigurationError('invalid prebuffer {} and maximum buffer'
+                                     ' {}'.format(prebuffer, max_buffer))
+
+        self.prebuffer = prebuffer
+        self.max_buffer = max_buffer
+
+        if outputs is None:
+            self.outputs = {}
+        else:
+            self.outputs = outputs
+
+        if groups is None:
+            self.groups = {}
+        else:
+            self.groups = groups
+
+        for group, sites in self.groups.items():
+            if group in self.outputs:
+                raise ConfigurationError('group {} has the site ID of an'
+                                         ' output'.format(group))
+            for site in sites:
+                if site not in self.outputs:
+                    raise ConfigurationError('group {} contains unknown'
+                                             ' output {}'.format(group, site))
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.PlayerConfig` object with settings from a
+        JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the audio player
+                settings. Defaults to {}.
+
+        Returns:
+            :class:`.PlayerConfig`: An object with the audio player settings.
+
+        The JSON object should have the following format:
+
+        {
+            "prebuffer": 0.5,
+            "max_buffer": 30,
+            "outputs": {
+                "kitchen": "USB PnP Sound Device: Audio (hw:1,0)",
+                "living-room": {
+                    "regex": "^bcm2835"
+                }
+            },
+            "groups": {
+                "downstairs": ["kitchen", "living-room"]
+            }
+        }
+        """
+        if json_object is None:
+            json_object = {}
+
+        outputs = {site: AudioDeviceConfig.from_json(device)
+                   for site, device in json_object.get(OUTPUTS, {}).items()}
+
+        return cls(prebuffer=json_object.get(PREBUFFER, DEFAULT_PREBUFFER),
+                   max_buffer=json_object.get(MAX_BUFFER, DEFAULT_MAX_BUFFER),
+                   outputs=outputs,
+                   groups=json_object.get(GROUPS, {}))
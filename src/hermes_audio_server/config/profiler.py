@@ -0,0 +1,58 @@
+"""Class for the profiler configuration of hermes-audio-server."""
+import tempfile
+
+# Default values
+DEFAULT_DIRECTORY = tempfile.gettempdir()
+DEFAULT_INTERVAL = 0.005
+
+# Keys in the JSON configuration file
+DIRECTORY = 'directory'
+INTERVAL = 'interval'
+
+
+class ProfilerConfig:
+    """This class represents the settings of the sampling profiler of a
+    Hermes audio server.
+
+    Attributes:
+        directory (str): The directory where the profiler writes its results.
+        interval (float): The time in seconds between two samples of the
+            profiler.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, interval=DEFAULT_INTERVAL):
+        """Initialize a :class:`.ProfilerConfig` object.
+
+        Args:
+            directory (str, optional): The directory where the profiler writes
+                its results. Defaults to the directory for temporary files.
+            interval (float, optional): The time in seconds between two
+                samples of the profiler. Defaults to 0.005.
+        """
+        self.directory = directory
+        self.interval = interval
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.ProfilerConfig` object with settings from a
+        JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the profiler
+                settings. Defaults to {}.
+
+        Returns:
+            :class:`.ProfilerConfig`: An object with the profiler settings.
+
+        The JSON object should have the following format:
+
+        {
+            "directory": "/tmp",
+            "interval": 0.005
+        }
+        """
+        if json_object is None:
+            json_object = {}
+
+        return cls(directory=json_object.get(DIRECTORY, DEFAULT_DIRECTORY),
+                   interval=json_object.get(INTERVAL, DEFAULT_INTERVAL))
@@ -0,0 +1,105 @@
+"""Class for the dialogue session configuration of hermes-audio-server."""
+from hermes_audio_server.exceptions import ConfigurationError
+
+# Streaming modes
+FULL = 'full'
+VAD = 'vad'
+LOCAL = 'local'
+IDLE = 'idle'
+MODES = (FULL, VAD, LOCAL, IDLE)
+
+# Default values
+DEFAULT_HOTWORD = FULL
+DEFAULT_LISTENING = FULL
+DEFAULT_IDLE = IDLE
+
+# Keys in the JSON configuration file
+HOTWORD = 'hotword'
+LISTENING = 'listening'
+IDLE_KEY = 'idle'
+
+
+class SessionConfig:
+    """This class represents the settings for streaming audio depending on
+    the state of the dialogue session of the site.
+
+    Each setting is one of the streaming modes 'full' (publish all audio
+    frames), 'vad' (publish the audio frames of voice messages), 'local'
+    (only stream audio frames on the local audio tap) and 'idle' (don't
+    stream audio frames).
+
+    Attributes:
+        enabled (bool): Whether or not Hermes Audio Recorder follows the
+            dialogue session of the site.
+        hotword (str): The streaming mode while hotword detection is on.
+        listening (str): The streaming mode while the ASR is listening.
+        idle (str): The streaming mode while hotword detection is off and the
+            ASR isn't listening.
+    """
+
+    def __init__(self, enabled=False, hotword=DEFAULT_HOTWORD,
+                 listening=DEFAULT_LISTENING, idle=DEFAULT_IDLE):
+        """Initialize a :class:`.SessionConfig` object.
+
+        Args:
+            enabled (bool): Whether or not Hermes Audio Recorder follows the
+                dialogue session of the site. Defaults to False.
+            hotword (str): The streaming mode while hotword detection is on.
+                Defaults to 'full'.
+            listening (str): The streaming mode while the ASR is listening.
+                Defaults to 'full'.
+            idle (str): The streaming mode while hotword detection is off and
+                the ASR isn't listening. Defaults to 'idle'.
+
+        All arguments are optional.
+
+        Raises:
+            :exc:`ConfigurationError`: If a streaming mode isn't valid.
+        """
+        for mode in (hotword, listening, idle):
+            if mode not in MODES:
+                raise ConfigurationError('unknown streaming mode'
+                                         ' {}'.format(mode))
+
+        self.enabled = enabled
+        self.hotword = hotword
+        self.listening = listening
+        self.idle = idle
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.SessionConfig` object with settings from a
+        JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the dialogue session
+                settings. Defaults to {}.
+
+        Returns:
+            :class:`.SessionConfig`: An object with the dialogue session
+            settings.
+
+        The JSON object should have the following format:
+
+        {
+            "hotword": "full",
+            "listening": "full",
+            "idle": "idle"
+        }
+        """
+        if json_object is None:
+            ret = cls(enabled=False)
+        else:
+            ret = cls(enabled=True,
+                      hotword=json_object.get(HOTWORD, DEFAULT_HOTWORD),
+                      listening=json_object.get(LISTENING, DEFAULT_LISTENING),
+                      idle=json_object.get(IDLE_KEY, DEFAULT_IDLE))
+
+        return ret
+
+    @property
+    def modes(self):
+        """set: The streaming modes that are used."""
+        if not self.enabled:
+            return set()
+        return {self.hotword, self.listening, self.idle}
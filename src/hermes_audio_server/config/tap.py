@@ -0,0 +1,58 @@
+"""Class for the local audio tap configuration of hermes-audio-server."""
+
+# Default values
+DEFAULT_PATH = '/run/hermes-audio-server/{}.sock'
+
+# Keys in the JSON configuration file
+PATH = 'path'
+
+
+class TapConfig:
+    """This class represents the local audio tap settings for Hermes Audio
+    Recorder.
+
+    Attributes:
+        enabled (bool): Whether or not the local audio tap is enabled.
+        path (str): The path of the Unix domain socket. The string '{}' is
+            replaced by the site ID.
+    """
+
+    def __init__(self, enabled=False, path=DEFAULT_PATH):
+        """Initialize a :class:`.TapConfig` object.
+
+        Args:
+            enabled (bool): Whether or not the local audio tap is enabled.
+                Defaults to False.
+            path (str): The path of the Unix domain socket. Defaults to
+                '/run/hermes-audio-server/{}.sock'.
+
+        All arguments are optional.
+        """
+        self.enabled = enabled
+        self.path = path
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.TapConfig` object with settings from a JSON
+        object.
+
+        Args:
+            json_object (optional): The JSON object with the local audio tap
+                settings. Defaults to {}.
+
+        Returns:
+            :class:`.TapConfig`: An object with the local audio tap settings.
+
+        The JSON object should have the following format:
+
+        {
+            "path": "/run/hermes-audio-server/{}.sock"
+        }
+        """
+        if json_object is None:
+            ret = cls(enabled=False)
+        else:
+            ret = cls(enabled=True,
+                      path=json_object.get(PATH, DEFAULT_PATH))
+
+        return ret
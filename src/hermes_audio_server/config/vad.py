@@ -1,17 +1,91 @@
 """Class for the VAD configuration of hermes-audio-server."""
+from hermes_audio_server.exceptions import ConfigurationError
 
 # Default values
 DEFAULT_MODE = 0
 DEFAULT_SILENCE = 2
 DEFAULT_STATUS_MESSAGES = False
+DEFAULT_UTTERANCE_TOPIC = 'hermes/audioServer/{}/utterance'
+DEFAULT_MAX_LENGTH = 30
 
 # Keys in the JSON configuration file
 MODE = 'mode'
 SILENCE = 'silence'
 STATUS_MESSAGES = 'status_messages'
+UTTERANCE = 'utterance'
+TOPIC = 'topic'
+MAX_LENGTH = 'max_length'
 
 
 # TODO: Define __str__() for each class with explicit settings for debugging.
+class UtteranceConfig:
+    """This class represents the settings for publishing complete voice
+    messages instead of separate audio frames.
+
+    Attributes:
+        enabled (bool): Whether or not Hermes Audio Recorder publishes
+            complete voice messages.
+        topic (str): The MQTT topic for the voice messages. The string '{}' is
+            replaced by the site ID.
+        max_length (int): The maximum length in seconds of a voice message.
+            Longer voice messages are split.
+    """
+
+    def __init__(self, enabled=False, topic=DEFAULT_UTTERANCE_TOPIC,
+                 max_length=DEFAULT_MAX_LENGTH):
+        """Initialize a :class:`.UtteranceConfig` object.
+
+        Args:
+            enabled (bool): Whether or not Hermes Audio Recorder publishes
+                complete voice messages. Defaults to False.
+            topic (str): The MQTT topic for the voice messages. Defaults to
+                'hermes/audioServer/{}/utterance'.
+            max_length (int): The maximum length in seconds of a voice message.
+                Defaults to 30.
+
+        All arguments are optional.
+
+        Raises:
+            :exc:`ConfigurationError`: If :attr:`max_length` isn't positive.
+        """
+        if max_length <= 0:
+            raise ConfigurationError('invalid maximum length {} of a voice'
+                                     ' message'.format(max_length))
+
+        self.enabled = enabled
+        self.topic = topic
+        self.max_length = max_length
+
+    @classmethod
+    def from_json(cls, json_object=None):
+        """Initialize a :class:`.UtteranceConfig` object with settings from a
+        JSON object.
+
+        Args:
+            json_object (optional): The JSON object with the utterance
+                settings. Defaults to {}.
+
+        Returns:
+            :class:`.UtteranceConfig`: An object with the utterance settings.
+
+        The JSON object should have the following format:
+
+        {
+            "topic": "hermes/audioServer/{}/utterance",
+            "max_length": 30
+        }
+        """
+        if json_object is None:
+            ret = cls(enabled=False)
+        else:
+            ret = cls(enabled=True,
+                      topic=json_object.get(TOPIC, DEFAULT_UTTERANCE_TOPIC),
+                      max_length=json_object.get(MAX_LENGTH,
+                                                 DEFAULT_MAX_LENGTH))
+
+        return ret
+
+
 class VADConfig:
     """This class represents the VAD settings for Hermes Audio Recorder.
 
@@ -25,9 +99,12 @@ class VADConfig:
         status_messages (bool): Whether or not Hermes Audio Recorder sends
             messages on MQTT when it detects the start or end of a voice
             message.
+        utterance (:class:`.UtteranceConfig`): The settings for publishing
+            complete voice messages instead of separate audio frames.
     """
 
-    def __init__(self, enabled=False, mode=0, silence=2, status_messages=False):
+    def __init__(self, enabled=False, mode=0, silence=2, status_messages=False,
+                 utterance=None):
         """Initialize a :class:`.VADConfig` object.
 
         Args:
@@ -39,6 +116,10 @@ class VADConfig:
             status_messages (bool): Whether or not Hermes Audio Recorder sends
                 messages on MQTT when it detects the start or end of a voice
                 message. Defaults to False.
+            utterance (:class:`.UtteranceConfig`): The settings for publishing
+                complete voice messages instead of separate audio frames.
+                Defaults to a default :class:`.UtteranceConfig` object, which
+                disables this.
 
         All arguments are optional.
         """
@@ -47,6 +128,11 @@ class VADConfig:
         self.silence = silence
         self.status_messages = status_messages
 
+        if utterance is None:
+            self.utterance = UtteranceConfig()
+        else:
+            self.utterance = utterance
+
     @classmethod
     def from_json(cls, json_object=None):
         """Initialize a :class:`.VADConfig` object with settings from a
@@ -64,7 +150,11 @@ class VADConfig:
         {
             "mode": 0,
             "silence": 2,
-            "status_messages": true
+            "status_messages": true,
+            "utterance": {
+                "topic": "hermes/audioServer/{}/utterance",
+                "max_length": 30
+            }
         }
         """
         if json_object is None:
@@ -74,6 +164,8 @@ class VADConfig:
                       mode=json_object.get(MODE, DEFAULT_MODE),
                       silence=json_object.get(SILENCE, DEFAULT_SILENCE),
                       status_messages=json_object.get(STATUS_MESSAGES,
-                                                      DEFAULT_STATUS_MESSAGES))
+                                                      DEFAULT_STATUS_MESSAGES),
+                      utterance=UtteranceConfig.from_json(
+                          json_object.get(UTTERANCE)))
 
         return ret
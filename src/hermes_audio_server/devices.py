@@ -0,0 +1,343 @@
+"""This module contains helper classes to enumerate and select the audio
+devices of Hermes Audio Server.
+
+Probing which sample rates each device supports means opening every device
+a couple of times, which is slow on some platforms. That's why the result of
+the enumeration is cached in a JSON file, together with a fingerprint of the
+audio hardware. As long as the fingerprint doesn't change, the cached list is
+reused. If probing a device fails for another reason than an unsupported
+format, for instance because the device is busy, the list isn't cached, so
+the device is probed again the next time.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import pyaudio
+
+from hermes_audio_server.exceptions import AudioDeviceNotFoundError, \
+    NoDefaultAudioDeviceError
+
+CACHE_VERSION = 1
+INPUT = 'input'
+OUTPUT = 'output'
+SAMPLE_RATES = (8000, 11025, 16000, 22050, 32000, 44100, 48000)
+SOUND_CARDS = '/proc/asound/cards'
+
+MAX_CHANNELS = {INPUT: 'maxInputChannels', OUTPUT: 'maxOutputChannels'}
+RATES = {INPUT: 'inputRates', OUTPUT: 'outputRates'}
+
+# PortAudio errors that mean a device doesn't support a format
+FORMAT_ERRORS = (pyaudio.paInvalidSampleRate, pyaudio.paInvalidChannelCount,
+                 pyaudio.paSampleFormatNotSupported,
+                 pyaudio.paBadIODeviceCombination, pyaudio.paInvalidDevice)
+
+
+def get_fingerprint(audio):
+    """Compute a fingerprint of the audio hardware.
+
+    The fingerprint is based on the PortAudio version, the basic information
+    of each device (which PortAudio already gathered when it was initialized)
+    and the list of sound cards of the kernel, if available.
+
+    Args:
+        audio (:class:`pyaudio.PyAudio`): The PyAudio object.
+
+    Returns:
+        str: A hexadecimal hash of the audio hardware.
+    """
+    fingerprint = hashlib.sha1()
+    fingerprint.update(pyaudio.get_portaudio_version_text().encode())
+
+    for index in range(audio.get_device_count()):
+        device = audio.get_device_info_by_index(index)
+        fingerprint.update(repr((index,
+                                 device['name'],
+                                 device['hostApi'],
+                                 device['maxInputChannels'],
+                                 device['maxOutputChannels'],
+                                 device['defaultSampleRate'])).encode())
+
+    try:
+        fingerprint.update(Path(SOUND_CARDS).read_bytes())
+    except OSError:
+        pass
+
+    return fingerprint.hexdigest()
+
+
+class AudioDevices:
+    """This class represents the list of audio devices available to PortAudio.
+
+    Attributes:
+        audio (:class:`pyaudio.PyAudio`): The PyAudio object.
+        devices (list): A list of dicts with the information of each device.
+        fingerprint (str): The fingerprint of the audio hardware.
+    """
+
+    def __init__(self, audio, devices, fingerprint):
+        """Initialize an :class:`.AudioDevices` object.
+
+        Args:
+            audio (:class:`pyaudio.PyAudio`): The PyAudio object.
+            devices (list): A list of dicts with the information of each
+                device.
+            fingerprint (str): The fingerprint of the audio hardware.
+        """
+        self.audio = audio
+        self.devices = devices
+        self.fingerprint = fingerprint
+        self._formats = {}
+
+    @classmethod
+    def probe(cls, audio, cache=None, logger=None):
+        """Enumerate the audio devices, reusing a cached list if the
+        fingerprint of the audio hardware hasn't changed.
+
+        Args:
+            audio (:class:`pyaudio.PyAudio`): The PyAudio object.
+            cache (str, optional): Path to the cache file. If `None`, the
+                list of devices isn't cached.
+            logger (:class:`logging.Logger`, optional): The Logger object for
+                logging messages.
+
+        Returns:
+            :class:`.AudioDevices`: An object with the list of audio devices.
+        """
+        fingerprint = get_fingerprint(audio)
+
+        if cache:
+            try:
+                with Path(cache).open('r') as json_file:
+                    cached = json.load(json_file)
+                if cached.get('version') == CACHE_VERSION and \
+                   cached.get('fingerprint') == fingerprint:
+                    if logger:
+                        logger.debug('Using cached list of audio devices'
+                                     ' from %s.', cache)
+                    return cls(audio, cached['devices'], fingerprint)
+            except (OSError, ValueError, KeyError):
+                pass
+
+        if logger:
+            logger.debug('Probing for available audio devices...')
+
+        devices = []
+        failed = False
+        for index in range(audio.get_device_count()):
+            info = audio.get_device_info_by_index(index)
+            device = {'index': index,
+                      'name': info['name'],
+                      'hostApi': info['hostApi'],
+                      'maxInputChannels': info['maxInputChannels'],
+                      'maxOutputChannels': info['maxOutputChannels'],
+                      'defaultSampleRate': info['defaultSampleRate']}
+            for inout in (INPUT, OUTPUT):
+                device[RATES[inout]] = []
+                if not device[MAX_CHANNELS[inout]]:
+                    continue
+                for rate in SAMPLE_RATES:
+                    supported = _is_supported(audio, index, inout, rate, 1,
+                                              pyaudio.paInt16)
+                    if supported is None:
+                        failed = True
+                    elif supported:
+                        device[RATES[inout]].append(rate)
+            devices.append(device)
+
+        if cache and failed:
+            if logger:
+                logger.warning('Probing some audio devices failed, so the list'
+                               ' of audio devices isn\'t cached.')
+        elif cache:
+            try:
+                Path(cache).parent.mkdir(parents=True, exist_ok=True)
+                with Path(cache).open('w') as json_file:
+                    json.dump({'version': CACHE_VERSION,
+                               'fingerprint': fingerprint,
+                               'devices': devices}, json_file, indent=2)
+                if logger:
+                    logger.debug('Cached list of audio devices in %s.', cache)
+            except OSError as error:
+                if logger:
+                    logger.warning('Can\'t cache list of audio devices in %s:'
+                                   ' %s', cache, error.strerror)
+
+        return cls(audio, devices, fingerprint)
+
+    def by_direction(self, inout):
+        """Return the devices with at least one channel in one direction.
+
+        Args:
+            inout (str): 'input' or 'output'.
+
+        Returns:
+            list: A list of dicts with the information of each device.
+        """
+        return [device for device in self.devices
+                if device[MAX_CHANNELS[inout]]]
+
+    def default(self, inout):
+        """Return the default device in one direction.
+
+        Args:
+            inout (str): 'input' or 'output'.
+
+        Returns:
+            dict: The information of the default device.
+
+        Raises:
+            :exc:`NoDefaultAudioDeviceError`: If there's no default device.
+        """
+        try:
+            if inout == INPUT:
+                index = self.audio.get_default_input_device_info()['index']
+            else:
+                index = self.audio.get_default_output_device_info()['index']
+        except OSError:
+            raise NoDefaultAudioDeviceError(inout)
+
+        for device in self.devices:
+            if device['index'] == index:
+                return device
+
+        raise NoDefaultAudioDeviceError(inout)
+
+    def select(self, selection, inout):
+        """Select a device in one direction.
+
+        Args:
+            selection (:class:`.AudioDeviceConfig`): The device selection.
+            inout (str): 'input' or 'output'.
+
+        Returns:
+            dict: The information of the first device matching the selection.
+
+        Raises:
+            :exc:`NoDefaultAudioDeviceError`: If the default device is
+                selected and there's no default device.
+
+            :exc:`AudioDeviceNotFoundError`: If no device matches the
+                selection.
+        """
+        if selection.default:
+            return self.default(inout)
+
+        for device in self.by_direction(inout):
+            if selection.matches(device):
+                return device
+
+        raise AudioDeviceNotFoundError(inout, str(selection))
+
+    def supports_format(self, device, inout, rate, channels=1,
+                        sample_format=pyaudio.paInt16):
+        """Check whether a device supports an audio format.
+
+        Mono 16-bit audio at one of the standard sample rates is looked up in
+        the list of probed rates. Other formats are checked with PortAudio
+        and the result is remembered.
+
+        Args:
+            device (dict): The information of the device.
+            inout (str): 'input' or 'output'.
+            rate (int): The sample rate in Hz.
+            channels (int, optional): The number of channels. Defaults to 1.
+            sample_format (int, optional): The PortAudio sample format.
+                Defaults to 16-bit integers.
+
+        Returns:
+            bool: True if the device supports the format, or if PortAudio
+            can't tell.
+        """
+        if channels == 1 and sample_format == pyaudio.paInt16 and \
+           rate in SAMPLE_RATES:
+            return rate in device[RATES[inout]]
+
+        key = (device['index'], inout, rate, channels, sample_format)
+        if key in self._formats:
+            return self._formats[key]
+
+        supported = _is_supported(self.audio, device['index'], inout, rate,
+                                  channels, sample_format)
+        if supported is None:
+            # The device may be busy, for instance because it's playing
+            # another sound, so let opening the stream decide.
+            return True
+        self._formats[key] = supported
+        return supported
+
+    @staticmethod
+    def sample_rates(device, inout):
+        """Return the standard sample rates a device supports for mono 16-bit
+        audio.
+
+        Args:
+            device (dict): The information of the device.
+            inout (str): 'input' or 'output'.
+
+        Returns:
+            list: The supported sample rates in Hz.
+        """
+        return list(device[RATES[inout]])
+
+    def describe(self, inout):
+        """Describe the devices in one direction in a human-readable way.
+
+        Args:
+            inout (str): 'input' or 'output'.
+
+        Returns:
+            list: A list of strings, one for each device.
+        """
+        try:
+            default_index = self.default(inout)['index']
+        except NoDefaultAudioDeviceError:
+            default_index = None
+
+        lines = []
+        for device in self.by_direction(inout):
+            rates = ', '.join(str(rate) for rate in device[RATES[inout]])
+            lines.append('{} [{}] {} ({} channels, sample rates: {})'.format(
+                '*' if device['index'] == default_index else ' ',
+                device['index'],
+                device['name'],
+                device[MAX_CHANNELS[inout]],
+                rates or 'none'))
+        return lines
+
+
+def _is_supported(audio, index, inout, rate, channels, sample_format):
+    """Ask PortAudio whether a device supports an audio format. Return `None`
+    if PortAudio can't tell, for instance because the device is busy."""
+    if inout == INPUT:
+        arguments = {'input_device': index,
+                     'input_channels': channels,
+                     'input_format': sample_format}
+    else:
+        arguments = {'output_device': index,
+                     'output_channels': channels,
+                     'output_format': sample_format}
+    try:
+        return audio.is_format_supported(rate, **arguments)
+    except ValueError as error:
+        if len(error.args) > 1 and error.args[1] in FORMAT_ERRORS:
+            return False
+        return None
+
+
+def list_devices(config, inout):
+    """Print the audio devices in one direction.
+
+    Args:
+        config (:class:`.ServerConfig`): The configuration of the audio
+            server.
+        inout (str): 'input' or 'output'.
+    """
+    audio = pyaudio.PyAudio()
+    try:
+        devices = AudioDevices.probe(audio, config.audio.device_cache)
+        print('Available audio {} devices (* = default):'.format(inout))
+        for line in devices.describe(inout):
+            print(line)
+    finally:
+        audio.terminate()
@@ -16,6 +16,16 @@ class ConfigurationFileNotFoundError(HermesAudioServerError):
         self.filename = filename
 
 
+class AudioDeviceNotFoundError(HermesAudioServerError):
+    """Raised when no audio device matches the configured device."""
+
+    def __init__(self, inout, device):
+        """Initialize the exception with a string representing input or output
+        and a string representing the configured device."""
+        self.inout = inout
+        self.device = device
+
+
 class NoDefaultAudioDeviceError(HermesAudioServerError):
     """Raised when there's no default audio device available."""
 
@@ -32,3 +42,23 @@ class UnsupportedPlatformError(HermesAudioServerError):
     def __init__(self, platform):
         """Initialize the exception with a string representing the platform."""
         self.platform = platform
+
+
+class UnsupportedSampleRateError(HermesAudioServerError):
+    """Raised when an audio device doesn't support the needed sample rate."""
+
+    def __init__(self, inout, device, rate):
+        """Initialize the exception with a string representing input or output,
+        the name of the device and the sample rate."""
+        self.inout = inout
+        self.device = device
+        self.rate = rate
+
+
+class ConfigurationError(HermesAudioServerError):
+    """Raised when a setting in the configuration file is not valid."""
+
+    def __init__(self, message):
+        """Initialize the exception with a string describing the invalid
+        setting."""
+        self.message = message
@@ -0,0 +1,136 @@
+"""This module contains a jitter buffer for audio that Hermes Audio Player
+receives in chunks, so it can start playing before the whole sound has
+arrived.
+"""
+from collections import deque
+import queue
+from threading import Condition
+
+
+class JitterBuffer:
+    """This class represents a jitter buffer between the MQTT thread, which
+    puts chunks of audio in it, and the playback thread, which gets them.
+
+    Chunks are put in the buffer with their index, so chunks that arrive out
+    of order are played in the right order. Playback starts when the buffer
+    contains at least :attr:`prebuffer` bytes of consecutive chunks, or when
+    the last chunk has arrived. After an underrun, playback waits for the
+    prebuffer again.
+
+    The buffer holds at most :attr:`max_size` bytes. Putting a chunk never
+    blocks: when the buffer is full, the chunk is dropped and playback skips
+    it. Only the missing chunk that playback is waiting for is always
+    accepted, so out-of-order chunks can't block playback.
+
+    Attributes:
+        prebuffer (int): The number of bytes to buffer before playback starts.
+        max_size (int): The maximum number of bytes in the buffer.
+        size (int): The number of bytes in the buffer.
+    """
+
+    def __init__(self, prebuffer, max_size):
+        """Initialize a :class:`.JitterBuffer` object.
+
+        Args:
+            prebuffer (int): The number of bytes to buffer before playback
+                starts.
+            max_size (int): The maximum number of bytes in the buffer.
+        """
+        self.prebuffer = prebuffer
+        self.max_size = max_size
+        self.size = 0
+        self._condition = Condition()
+        self._pending = {}
+        self._ready = deque()
+        self._ready_size = 0
+        self._skipped = set()
+        self._next = 0
+        self._last = None
+        self._buffering = True
+
+    @property
+    def complete(self):
+        """bool: Whether or not all chunks up to the last one are ready."""
+        return self._last is not None and self._next > self._last
+
+    def put(self, index, data, last=False):
+        """Put a chunk of audio in the buffer.
+
+        Args:
+            index (int): The index of the chunk, starting from 0.
+            data (bytes): The audio data.
+            last (bool, optional): Whether or not this is the last chunk.
+                Defaults to False.
+
+        Returns:
+            bool: False if the chunk was dropped because the buffer is full.
+        """
+        with self._condition:
+            if index < self._next or index in self._pending or \
+               index in self._skipped:
+                return True  # Duplicate chunk
+
+            if last:
+                self._last = index
+
+            # Playback is waiting for this chunk, so accept it anyway.
+            waiting = index == self._next and not self._ready
+            if waiting or self.size + len(data) <= self.max_size:
+                self._pending[index] = data
+                self.size += len(data)
+                dropped = False
+            else:
+                self._skipped.add(index)
+                dropped = True
+
+            while True:
+                if self._next in self._pending:
+                    chunk = self._pending.pop(self._next)
+                    self._ready.append(chunk)
+                    self._ready_size += len(chunk)
+                elif self._next in self._skipped:
+                    self._skipped.remove(self._next)
+                else:
+                    break
+                self._next += 1
+
+            self._condition.notify_all()
+            return not dropped
+
+    def get(self, timeout=None):
+        """Get the next chunk of audio to play.
+
+        Args:
+            timeout (float, optional): The maximum time in seconds to wait for
+                a chunk. Defaults to None, which waits indefinitely.
+
+        Returns:
+            bytes: The audio data, or None if all chunks have been played.
+
+        Raises:
+            :exc:`queue.Empty`: If no chunk arrived in time.
+        """
+        with self._condition:
+            if not self._ready and not self.complete:
+                self._buffering = True
+
+            def available():
+                if self.complete:
+                    return True
+                if not self._ready:
+                    return False
+                if self._buffering:
+                    return self._ready_size >= self.prebuffer
+                return True
+
+            if not self._condition.wait_for(available, timeout):
+                raise queue.Empty
+
+            if not self._ready:
+                return None
+
+            self._buffering = False
+            chunk = self._ready.popleft()
+            self._ready_size -= len(chunk)
+            self.size -= len(chunk)
+            return chunk
@@ -1,8 +1,11 @@
 """This module contains helper functions to log messages from Hermes Audio
 Server."""
+import atexit
 import logging
-from logging.handlers import SysLogHandler
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
+import queue
 import sys
+import time
 
 import colorlog
 
@@ -15,6 +18,7 @@ LOG_COLORS = {'DEBUG':    'white',
               'WARNING':  'yellow',
               'ERROR':    'red',
               'CRITICAL': 'bold_red'}
+MAX_QUEUED_RECORDS = 10000
 
 
 def get_domain_socket():
@@ -27,8 +31,57 @@ def get_domain_socket():
     raise UnsupportedPlatformError(sys.platform)
 
 
+class BackgroundListener(QueueListener):
+    """A queue listener that doesn't fail to stop when the queue is full."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(QueueHandler):
+    """A log handler that hands off log records to a background thread, which
+    formats them and sends them to the real handler.
+
+    Logging a message never blocks: if the queue is full because the real
+    handler can't keep up, the log record is dropped.
+
+    Attributes:
+        handler (:class:`logging.Handler`): The real handler.
+        listener (:class:`.BackgroundListener`): The listener that runs the
+            background thread.
+        dropped (int): The number of dropped log records.
+    """
+
+    def __init__(self, handler):
+        """Initialize a :class:`.BackgroundHandler` object.
+
+        Args:
+            handler (:class:`logging.Handler`): The real handler.
+        """
+        super().__init__(queue.Queue(MAX_QUEUED_RECORDS))
+        self.handler = handler
+        self.listener = BackgroundListener(self.queue, handler,
+                                           respect_handler_level=True)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens in the background thread. This is safe because
+        # the arguments of our log messages are immutable.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
 def get_logger(command, verbose, daemon):
-    """Return a Logger object with the right level, formatter and handler."""
+    """Return a Logger object with the right level, formatter and handler.
+
+    The log records are handled in a background thread, which has to be
+    started with :func:`start_logging`. Until then they're kept in a queue.
+    """
 
     if daemon:
         handler = SysLogHandler(address=get_domain_socket())
@@ -46,6 +99,82 @@ def get_logger(command, verbose, daemon):
         logger.setLevel(logging.INFO)
 
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    logger.addHandler(BackgroundHandler(handler))
 
     return logger
+
+
+def start_logging(logger):
+    """Start the background threads that handle the log records of a logger.
+
+    Start them after daemonizing, because threads don't survive a fork. The
+    threads are stopped at exit, after handling the remaining log records.
+    """
+    for handler in logger.handlers:
+        if isinstance(handler, BackgroundHandler):
+            handler.listener.start()
+            atexit.register(handler.listener.stop)
+
+
+class FrameLogSampler:
+    """This class logs debug messages about published audio frames without
+    flooding the log.
+
+    Instead of logging each audio frame, it logs every Nth audio frame and/or
+    a periodic summary of the number of audio frames and bytes.
+
+    Attributes:
+        logger (:class:`logging.Logger`): The Logger object for logging
+            messages.
+        every (int): Log every Nth audio frame. 0 disables this.
+        interval (int): Log a summary every this number of seconds. 0
+            disables this.
+    """
+
+    def __init__(self, logger, every=0, interval=10):
+        """Initialize a :class:`.FrameLogSampler` object.
+
+        Args:
+            logger (:class:`logging.Logger`): The Logger object for logging
+                messages.
+            every (int, optional): Log every Nth audio frame. Defaults to 0,
+                which disables this.
+            interval (int, optional): Log a summary every this number of
+                seconds. Defaults to 10. 0 disables this.
+        """
+        self.logger = logger
+        self.every = every
+        self.interval = interval
+        self._count = 0
+        self._frames = 0
+        self._bytes = 0
+        self._since = time.monotonic()
+
+    def published(self, topic, n_bytes):
+        """Register an audio frame published on MQTT.
+
+        Args:
+            topic (str): The MQTT topic.
+            n_bytes (int): The length of the message in bytes.
+        """
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        self._count += 1
+        self._frames += 1
+        self._bytes += n_bytes
+
+        if self.every and self._count % self.every == 0:
+            self.logger.debug('Published message %d on MQTT topic %s: %d'
+                              ' bytes', self._count, topic, n_bytes)
+
+        if self.interval:
+            now = time.monotonic()
+            if now - self._since >= self.interval:
+                self.logger.debug('Published %d messages (%d bytes) on MQTT'
+                                  ' topic %s in the last %.0f seconds.',
+                                  self._frames, self._bytes, topic,
+                                  now - self._since)
+                self._frames = 0
+                self._bytes = 0
+                self._since = now
@@ -1,9 +1,16 @@
 """Module with an MQTT client. Both the audio player and audio recorder class
 inherit from this class.
 """
-from paho.mqtt.client import Client
+from threading import Lock, Thread
+
+from paho.mqtt.client import Client, MQTT_ERR_SUCCESS
 import pyaudio
 
+from hermes_audio_server.devices import AudioDevices
+from hermes_audio_server.spool import MessageQueue, SpoolFile
+
+PUBLISH_TIMEOUT = 10
+
 
 class MQTTClient:
     """This class represents an MQTT client for Hermes Audio Server.
@@ -12,7 +19,7 @@ class MQTTClient:
     class, but an object of one of its subclasses.
     """
 
-    def __init__(self, config, verbose, logger):
+    def __init__(self, config, verbose, logger, audio=None, mqtt=None):
         """Initialize an MQTT client.
 
         Args:
@@ -22,14 +29,58 @@ class MQTTClient:
                 mode.
             logger (:class:`logging.Logger`): The Logger object for logging
                 messages.
+            audio (:class:`pyaudio.PyAudio`, optional): The PyAudio object.
+                Defaults to a new :class:`pyaudio.PyAudio` object. Benchmarks
+                pass another object with the same interface.
+            mqtt (:class:`paho.mqtt.client.Client`, optional): The paho MQTT
+                client. Defaults to a new :class:`paho.mqtt.client.Client`
+                object. Benchmarks pass another object with the same
+                interface.
         """
         self.config = config
         self.verbose = verbose
         self.logger = logger
-        self.mqtt = Client()
+        if mqtt is None:
+            self.mqtt = Client()
+        else:
+            self.mqtt = mqtt
+        self.online = False
+        # Changes each time the client connects or disconnects, so a thread
+        # that publishes queued messages notices that its connection is gone.
+        self.connection_id = 0
+        self.publish_lock = Lock()
+        self.drain_lock = Lock()
+        self.queue = MessageQueue(self.config.mqtt.queue.max_bytes,
+                                  self.config.mqtt.queue.overflow)
+        self.spool = None
+        if self.config.mqtt.queue.spool:
+            try:
+                self.spool = SpoolFile(self.config.mqtt.queue.spool,
+                                       self.config.mqtt.queue.spool_max_bytes,
+                                       self.config.mqtt.queue.spool_max_age)
+                self.logger.debug('Spooling voice messages to %s when the'
+                                  ' MQTT broker is unreachable.',
+                                  self.config.mqtt.queue.spool)
+                if self.spool.recovered:
+                    self.logger.info('Found %d messages from a previous run'
+                                     ' in spool file %s. Publishing the ones'
+                                     ' that are at most %s seconds old...',
+                                     self.spool.recovered,
+                                     self.config.mqtt.queue.spool,
+                                     self.config.mqtt.queue.spool_max_age)
+            except OSError as error:
+                self.logger.warning('Can\'t open spool file %s: %s',
+                                    self.config.mqtt.queue.spool,
+                                    error.strerror)
         self.logger.debug('Using %s', pyaudio.get_portaudio_version_text())
-        self.logger.debug('Creating PyAudio object...')
-        self.audio = pyaudio.PyAudio()
+        if audio is None:
+            self.logger.debug('Creating PyAudio object...')
+            self.audio = pyaudio.PyAudio()
+        else:
+            self.audio = audio
+        self.devices = AudioDevices.probe(self.audio,
+                                          self.config.audio.device_cache,
+                                          self.logger)
 
         self.initialize()
 
@@ -52,10 +103,20 @@ class MQTTClient:
                               certfile=self.config.mqtt.tls.client_cert,
                               keyfile=self.config.mqtt.tls.client_key)
 
+        # Limit the number of QoS 1 and 2 messages paho keeps in memory.
+        self.mqtt.max_inflight_messages_set(
+            self.config.mqtt.max_inflight_messages)
+        self.mqtt.max_queued_messages_set(self.config.mqtt.max_queued_messages)
+
+        # Reconnect with an exponential backoff when the connection is lost or
+        # the broker is unreachable at startup.
+        self.mqtt.reconnect_delay_set(self.config.mqtt.reconnect.min_delay,
+                                      self.config.mqtt.reconnect.max_delay)
+
         self.logger.debug('Connecting to MQTT broker %s:%s...',
                           self.config.mqtt.host,
                           self.config.mqtt.port)
-        self.mqtt.connect(self.config.mqtt.host, self.config.mqtt.port)
+        self.mqtt.connect_async(self.config.mqtt.host, self.config.mqtt.port)
 
     def initialize(self):
         """Initialize the MQTT client."""
@@ -65,7 +126,7 @@ class MQTTClient:
         listening to MQTT topics and the callback methods are called.
         """
         self.logger.debug('Starting MQTT event loop...')
-        self.mqtt.loop_forever()
+        self.mqtt.loop_forever(retry_first_connection=True)
 
     def stop(self):
         """Disconnect from the MQTT broker and terminate the audio connection.
@@ -74,6 +135,141 @@ class MQTTClient:
         self.mqtt.disconnect()
         self.logger.debug('Terminating PyAudio object...')
         self.audio.terminate()
+        if self.spool:
+            self.spool.close()
+
+    def publish(self, topic, payload, qos=0, spool=False):
+        """Publish a message on MQTT.
+
+        If the connection to the MQTT broker is down, the message is put in a
+        queue with a limited size and published after reconnecting.
+
+        Args:
+            topic (str): The MQTT topic.
+            payload (bytes or str): The payload of the message.
+            qos (int, optional): The QoS level. Defaults to 0.
+            spool (bool, optional): Put the message in the spool file instead
+                of the in-memory queue if the connection is down and a spool
+                file is configured. Defaults to False.
+
+        Returns:
+            bool: False if the message was dropped.
+        """
+        with self.publish_lock:
+            if self.online:
+                info = self.mqtt.publish(topic, payload, qos)
+                return info.rc == MQTT_ERR_SUCCESS
+
+            if spool and self.spool:
+                return self.spool.append(topic, payload, qos)
+
+            return self.queue.put(topic, payload, qos)
+
+    def pop_queued_message(self):
+        """Remove the oldest message from the spool file or, if that's empty,
+        from the in-memory queue. Call this with :attr:`publish_lock` held.
+
+        Returns:
+            tuple: The message (topic, payload and QoS level) or `None` if both
+            are empty, and whether or not the message comes from the spool
+            file.
+        """
+        if self.spool:
+            message = self.spool.pop()
+            if message is not None:
+                return message, True
+        return self.queue.pop(), False
+
+    def requeue_message(self, message, spooled):
+        """Put a message that couldn't be published back in its queue. Call
+        this with :attr:`publish_lock` held."""
+        if spooled:
+            self.spool.requeue()
+        else:
+            self.queue.requeue(message)
+
+    def publish_queued_messages(self, connection_id):
+        """Publish the messages that have been queued while the connection to
+        the MQTT broker was down.
+
+        The spooled messages are published first, then the messages in the
+        in-memory queue. The messages that were queued when the client
+        connected are published one after another, each after the previous
+        one has been sent, so they don't pile up in memory again. The
+        messages that were queued in the meantime are then handed to paho at
+        once, and the client is online again, so a slow broker can't keep it
+        offline forever. A message that can't be published is put back in its
+        queue.
+
+        Only one thread publishes queued messages at a time. It stops as soon
+        as the connection it was started for is gone.
+
+        Args:
+            connection_id (int): The value of :attr:`connection_id` when the
+                client connected.
+        """
+        with self.drain_lock:
+            with self.publish_lock:
+                if connection_id != self.connection_id:
+                    return
+                backlog = len(self.queue)
+                if self.spool:
+                    backlog += self.spool.messages
+
+            published = 0
+            while published < backlog:
+                with self.publish_lock:
+                    if connection_id != self.connection_id:
+                        return
+                    message, spooled = self.pop_queued_message()
+                if message is None:
+                    break
+
+                info = self.mqtt.publish(*message)
+                if info.rc != MQTT_ERR_SUCCESS:
+                    with self.publish_lock:
+                        self.requeue_message(message, spooled)
+                    self.logger.warning('Connection lost while publishing'
+                                        ' queued messages.')
+                    return
+                info.wait_for_publish(PUBLISH_TIMEOUT)
+                published += 1
+
+            # Nothing is queued while the lock is held, so the messages that
+            # are published after this are published after the queued ones.
+            with self.publish_lock:
+                if connection_id != self.connection_id:
+                    return
+                while True:
+                    message, spooled = self.pop_queued_message()
+                    if message is None:
+                        break
+                    info = self.mqtt.publish(*message)
+                    if info.rc != MQTT_ERR_SUCCESS:
+                        self.requeue_message(message, spooled)
+                        self.logger.warning('Connection lost while'
+                                            ' publishing queued messages.')
+                        return
+                    published += 1
+
+                self.online = True
+                dropped = self.queue.dropped
+                self.queue.dropped = 0
+                expired = 0
+                if self.spool:
+                    dropped += self.spool.dropped
+                    self.spool.dropped = 0
+                    expired = self.spool.expired
+                    self.spool.expired = 0
+
+        if published or dropped:
+            self.logger.info('Published %d queued messages, dropped %d'
+                             ' messages while the connection was down.',
+                             published, dropped)
+        if expired:
+            self.logger.warning('Dropped %d spooled messages older than %s'
+                                ' seconds.', expired,
+                                self.config.mqtt.queue.spool_max_age)
 
     def on_connect(self, client, userdata, flags, result_code):
         """Callback that is called when the client connects to the MQTT broker.
@@ -83,9 +279,17 @@ class MQTTClient:
                          self.config.mqtt.host,
                          self.config.mqtt.port,
                          result_code)
+        if result_code == 0:
+            with self.publish_lock:
+                self.connection_id += 1
+                connection_id = self.connection_id
+            Thread(target=self.publish_queued_messages,
+                   args=(connection_id,), daemon=True).start()
 
-    def on_disconnect(self, client, userdata, flags, result_code):
-        """Callback that is called when the client connects from the MQTT
+    def on_disconnect(self, client, userdata, result_code):
+        """Callback that is called when the client disconnects from the MQTT
         broker."""
-        # This callback doesn't seem to be called.
+        with self.publish_lock:
+            self.online = False
+            self.connection_id += 1
         self.logger.info('Disconnected with result code %s.', result_code)
@@ -1,110 +1,462 @@
 """Module with the Hermes audio player class."""
+from collections import deque
 import io
 import json
+import queue
+from threading import Barrier, BrokenBarrierError, Lock, Thread
 import wave
 
 from humanfriendly import format_size
 
-from hermes_audio_server.exceptions import NoDefaultAudioDeviceError
+from hermes_audio_server.jitter import JitterBuffer
 from hermes_audio_server.mqtt import MQTTClient
 
 PLAY_BYTES = 'hermes/audioServer/{}/playBytes/+'
+PLAY_BYTES_STREAMING = 'hermes/audioServer/{}/playBytesStreaming/+/+/+'
 PLAY_FINISHED = 'hermes/audioServer/{}/playFinished'
-CHUNK = 256
+MAX_QUEUED_SOUNDS = 10
+MAX_FINISHED_STREAMS = 100
+STREAM_TIMEOUT = 10
+
+
+def read_wav(payload):
+    """Read the format and audio frames of a WAV file.
+
+    Args:
+        payload (bytes): The WAV file.
+
+    Returns:
+        tuple: The sample width in bytes, the number of channels, the frame
+        rate and the audio frames.
+
+    Raises:
+        :exc:`wave.Error`: If the WAV file is invalid.
+
+        :exc:`EOFError`: If the WAV file is truncated.
+    """
+    with io.BytesIO(payload) as wav_buffer:
+        with wave.open(wav_buffer, 'rb') as wav:
+            return (wav.getsampwidth(), wav.getnchannels(),
+                    wav.getframerate(), wav.readframes(wav.getnframes()))
+
+
+class AudioOutput:
+    """This class represents an audio output device that plays the sounds of
+    a site one after another in its own playback thread.
+
+    Attributes:
+        site (str): The site ID of the audio output.
+        device (dict): The information of the audio output device.
+        name (str): The name of the audio output device.
+        index (int): The PortAudio index of the audio output device.
+        sounds (:class:`queue.Queue`): The sounds waiting to be played.
+    """
+
+    def __init__(self, site, device):
+        """Initialize an :class:`.AudioOutput` object.
+
+        Args:
+            site (str): The site ID of the audio output.
+            device (dict): The information of the audio output device.
+        """
+        self.site = site
+        self.device = device
+        self.name = device['name']
+        self.index = device['index']
+        self.sounds = queue.Queue(MAX_QUEUED_SOUNDS)
+
+
+class Playback:
+    """This class represents the playback of a sound on one or more audio
+    outputs.
+
+    If a sound is played on several audio outputs, playback starts at the
+    same time on all of them, and it's finished when all of them have
+    finished playing it.
+
+    Attributes:
+        request_id (str): The request id of the sound.
+        site (str): The site ID of the sound, which can be a group.
+        barrier (:class:`threading.Barrier`): The barrier to start playback on
+            all audio outputs at the same time, or None for one audio output.
+    """
+
+    def __init__(self, request_id, site, n_outputs):
+        """Initialize a :class:`.Playback` object.
+
+        Args:
+            request_id (str): The request id of the sound.
+            site (str): The site ID of the sound.
+            n_outputs (int): The number of audio outputs that play the sound.
+        """
+        self.request_id = request_id
+        self.site = site
+        self.barrier = Barrier(n_outputs) if n_outputs > 1 else None
+        self._remaining = n_outputs
+        self._lock = Lock()
+
+    def finished(self):
+        """Register that an audio output has finished playing the sound.
+
+        Returns:
+            bool: True if all audio outputs have finished playing the sound.
+        """
+        with self._lock:
+            self._remaining -= 1
+            return not self._remaining
 
 
 class AudioPlayer(MQTTClient):
     """This class creates an MQTT client that acts as an audio player for the
     Hermes protocol.
+
+    The audio player can play the sounds of several sites, each on its own
+    audio output device, and of groups of these sites.
     """
 
     def initialize(self):
         """Initialize a Hermes audio player."""
-        self.logger.debug('Probing for available output devices...')
-        for index in range(self.audio.get_device_count()):
-            device = self.audio.get_device_info_by_index(index)
-            name = device['name']
-            channels = device['maxOutputChannels']
-            if channels:
-                self.logger.debug('[%d] %s', index, name)
-        try:
-            self.audio_out = self.audio.get_default_output_device_info()['name']
-        except OSError:
-            raise NoDefaultAudioDeviceError('output')
-        self.logger.info('Connected to audio output %s.', self.audio_out)
+        for device in self.devices.by_direction('output'):
+            self.logger.debug('[%d] %s', device['index'], device['name'])
+
+        outputs = self.config.player.outputs
+        if not outputs:
+            outputs = {self.config.site: self.config.audio.output}
+
+        self.outputs = {}
+        for site, selection in outputs.items():
+            output = AudioOutput(site, self.devices.select(selection,
+                                                           'output'))
+            self.outputs[site] = output
+            self.logger.info('Connected to audio output %s for site %s.',
+                             output.name, site)
+
+        self.groups = self.config.player.groups
+        for group, sites in self.groups.items():
+            self.logger.info('Playing sounds of group %s on sites %s.',
+                             group, ', '.join(sites))
+
+        # Each audio output plays its sounds one after another in a playback
+        # thread, so the MQTT thread keeps receiving messages while a sound is
+        # playing.
+        self.streams = {}
+        self.finished_streams = deque(maxlen=MAX_FINISHED_STREAMS)
+        self.streams_lock = Lock()
+
+    def start(self):
+        """Start the playback threads and the event loop to the MQTT broker."""
+        for output in self.outputs.values():
+            self.logger.debug('Starting playback thread for site %s...',
+                              output.site)
+            Thread(target=self.play_sounds, args=(output,),
+                   daemon=True).start()
+        super().start()
 
     def on_connect(self, client, userdata, flags, result_code):
         """Callback that is called when the audio player connects to the MQTT
         broker."""
         super().on_connect(client, userdata, flags, result_code)
-        # Listen to the MQTT topic defined in the Hermes protocol to play a WAV
-        # file.
-        # See https://docs.snips.ai/reference/hermes#playing-a-wav-sound
-        play_bytes = PLAY_BYTES.format(self.config.site)
-        self.mqtt.subscribe(play_bytes)
-        self.mqtt.message_callback_add(play_bytes, self.on_play_bytes)
-        self.logger.info('Subscribed to %s topic.', play_bytes)
+        for site in list(self.outputs) + list(self.groups):
+            # Listen to the MQTT topic defined in the Hermes protocol to play
+            # a WAV file.
+            # See https://docs.snips.ai/reference/hermes#playing-a-wav-sound
+            play_bytes = PLAY_BYTES.format(site)
+            self.mqtt.subscribe(play_bytes, self.config.mqtt.qos.play_bytes)
+            self.mqtt.message_callback_add(play_bytes, self.on_play_bytes)
+            self.logger.info('Subscribed to %s topic.', play_bytes)
+
+            # Listen to the MQTT topic to play a WAV file that is streamed in
+            # chunks, as Rhasspy does.
+            play_bytes_streaming = PLAY_BYTES_STREAMING.format(site)
+            self.mqtt.subscribe(play_bytes_streaming,
+                                self.config.mqtt.qos.play_bytes)
+            self.mqtt.message_callback_add(play_bytes_streaming,
+                                           self.on_play_bytes_streaming)
+            self.logger.info('Subscribed to %s topic.', play_bytes_streaming)
+
+    def select_outputs(self, site, sample_format, n_channels, frame_rate,
+                       request_id):
+        """Select the audio outputs of a site or group that support the format
+        of a sound, and log a warning for the others.
+
+        Returns:
+            list: The :class:`.AudioOutput` objects.
+        """
+        self.logger.debug('Sample format: %s', sample_format)
+        self.logger.debug('Channels: %s', n_channels)
+        self.logger.debug('Frame rate: %s', frame_rate)
+
+        if site in self.outputs:
+            outputs = [self.outputs[site]]
+        else:
+            outputs = [self.outputs[member] for member in self.groups[site]]
+
+        selected = []
+        for output in outputs:
+            if self.devices.supports_format(output.device, 'output',
+                                            frame_rate, n_channels,
+                                            sample_format):
+                selected.append(output)
+            else:
+                self.logger.warning('Audio output %s doesn\'t support %s'
+                                    ' channels at %s Hz. Ignoring audio'
+                                    ' message with id %s on site %s.',
+                                    output.name, n_channels, frame_rate,
+                                    request_id, output.site)
+        if not selected:
+            self.logger.warning('No audio output of site %s supports the'
+                                ' format of audio message with id %s.',
+                                site, request_id)
+        return selected
+
+    def available_outputs(self, outputs, request_id):
+        """Select the audio outputs that have room in their queue for another
+        sound, and log a warning for the others.
+
+        The MQTT thread is the only thread that queues sounds, so a sound can
+        be queued on the selected audio outputs without blocking.
+
+        Returns:
+            list: The :class:`.AudioOutput` objects.
+        """
+        available = []
+        for output in outputs:
+            if output.sounds.full():
+                self.logger.warning('Too many sounds queued on audio output'
+                                    ' %s. Dropping audio message with id %s'
+                                    ' on site %s.', output.name, request_id,
+                                    output.site)
+            else:
+                available.append(output)
+        return available
 
     def on_play_bytes(self, client, userdata, message):
         """Callback that is called when the audio player receives a PLAY_BYTES
         message on MQTT.
         """
+        site = message.topic.split('/')[2]
         request_id = message.topic.split('/')[4]
         length = format_size(len(message.payload), binary=True)
         self.logger.info('Received an audio message of length %s'
                          ' with request id %s on site %s.',
                          length,
                          request_id,
-                         self.config.site)
+                         site)
+
+        try:
+            sample_width, n_channels, frame_rate, frames = \
+                read_wav(message.payload)
+        except wave.Error as error:
+            self.logger.warning('%s', str(error))
+            return
+        except EOFError:
+            self.logger.warning('End of WAV buffer')
+            return
 
-        with io.BytesIO(message.payload) as wav_buffer:
-            try:
-                with wave.open(wav_buffer, 'rb') as wav:
-                    sample_width = wav.getsampwidth()
-                    sample_format = self.audio.get_format_from_width(sample_width)
-                    n_channels = wav.getnchannels()
-                    frame_rate = wav.getframerate()
+        sample_format = self.audio.get_format_from_width(sample_width)
+        outputs = self.available_outputs(
+            self.select_outputs(site, sample_format, n_channels, frame_rate,
+                                request_id), request_id)
+        if not outputs:
+            self.publish_play_finished(request_id, site)
+            return
 
-                    self.logger.debug('Sample width: %s', sample_width)
-                    self.logger.debug('Channels: %s', n_channels)
-                    self.logger.debug('Frame rate: %s', frame_rate)
+        playback = Playback(request_id, site, len(outputs))
+        for output in outputs:
+            output.sounds.put_nowait((playback, sample_format, n_channels,
+                                      frame_rate, [frames]))
 
-                    self.logger.debug('Opening audio output stream...')
-                    stream = self.audio.open(format=sample_format,
-                                             channels=n_channels,
-                                             rate=frame_rate,
-                                             output=True)
+    def on_play_bytes_streaming(self, client, userdata, message):
+        """Callback that is called when the audio player receives a chunk of a
+        PLAY_BYTES_STREAMING message on MQTT.
+
+        The topic ends with the request id, the index of the chunk and 1 for
+        the last chunk or 0 for the other chunks. Each chunk is a WAV file.
+        The chunks are put in a jitter buffer for each audio output, and the
+        playback threads start playing them when enough audio is buffered.
+        This callback never blocks: a chunk that doesn't fit in a full jitter
+        buffer is skipped.
+        """
+        site = message.topic.split('/')[2]
+        request_id, index, last = message.topic.split('/')[4:]
+        try:
+            index = int(index)
+            last = bool(int(last))
+        except ValueError:
+            self.logger.warning('Invalid chunk on MQTT topic %s.',
+                                message.topic)
+            return
+
+        try:
+            sample_width, n_channels, frame_rate, frames = \
+                read_wav(message.payload)
+        except wave.Error as error:
+            self.logger.warning('%s', str(error))
+            return
+        except EOFError:
+            self.logger.warning('End of WAV buffer')
+            return
+        sample_format = self.audio.get_format_from_width(sample_width)
+        wav_format = (sample_format, n_channels, frame_rate)
+
+        key = (site, request_id)
+        with self.streams_lock:
+            if key in self.finished_streams:
+                return
+            entry = self.streams.get(key)
+            if entry is None:
+                outputs = self.available_outputs(
+                    self.select_outputs(site, sample_format, n_channels,
+                                        frame_rate, request_id), request_id)
+                if not outputs:
+                    self.finished_streams.append(key)
+                else:
+                    bytes_per_second = frame_rate * n_channels * sample_width
+                    buffers = [JitterBuffer(
+                        int(self.config.player.prebuffer * bytes_per_second),
+                        int(self.config.player.max_buffer * bytes_per_second))
+                               for _ in outputs]
+                    self.streams[key] = (buffers, wav_format)
+            else:
+                buffers, stream_format = entry
+
+        if entry is None:
+            if not outputs:
+                self.publish_play_finished(request_id, site)
+                return
+            self.logger.info('Receiving a streamed audio message with request'
+                             ' id %s on site %s.', request_id, site)
+            playback = Playback(request_id, site, len(outputs))
+            for output, buffer in zip(outputs, buffers):
+                output.sounds.put_nowait((playback, sample_format, n_channels,
+                                          frame_rate,
+                                          self.stream_chunks(key, buffer)))
+        elif wav_format != stream_format:
+            self.logger.warning('Chunk %s of audio message with id %s has'
+                                ' another format. Ignoring it.', index,
+                                request_id)
+            return
+
+        for buffer in buffers:
+            if not buffer.put(index, frames, last):
+                self.logger.warning('Jitter buffer full. Skipping chunk %s of'
+                                    ' audio message with id %s.', index,
+                                    request_id)
+
+    def stream_chunks(self, key, buffer):
+        """Yield the chunks of a streamed audio message from its jitter
+        buffer.
 
+        Raises:
+            :exc:`queue.Empty`: If the next chunk didn't arrive in time.
+        """
+        try:
+            while True:
+                data = buffer.get(STREAM_TIMEOUT)
+                if data is None:
+                    return
+                yield data
+        finally:
+            # With several audio outputs, the first one that stops playing
+            # the sound has received all chunks it's going to receive.
+            with self.streams_lock:
+                if self.streams.pop(key, None) is not None:
+                    self.finished_streams.append(key)
+
+    def play_sounds(self, output):
+        """Play the queued sounds of an audio output one after another."""
+        while True:
+            self.play(output, *output.sounds.get())
+
+    def play(self, output, playback, sample_format, n_channels, frame_rate,
+             chunks):
+        """Play a sound on an audio output and publish a message when all
+        audio outputs have finished playing it.
+
+        Args:
+            output (:class:`.AudioOutput`): The audio output.
+            playback (:class:`.Playback`): The playback of the sound.
+            sample_format (int): The PortAudio sample format.
+            n_channels (int): The number of channels.
+            frame_rate (int): The frame rate.
+            chunks (iterable): The audio frames in chunks.
+        """
+        stream = None
+        try:
+            for data in chunks:
+                if stream is None:
+                    self.logger.debug('Opening audio output stream...')
+                    stream = self.audio.open(
+                        format=sample_format,
+                        channels=n_channels,
+                        rate=frame_rate,
+                        output=True,
+                        output_device_index=output.index)
+                    self.synchronize(output, playback)
                     self.logger.debug('Playing WAV buffer on audio output...')
-                    data = wav.readframes(CHUNK)
-
-                    while data:
-                        stream.write(data)
-                        data = wav.readframes(CHUNK)
-
-                    stream.stop_stream()
-                    self.logger.debug('Closing audio output stream...')
-                    stream.close()
-
-                    self.logger.info('Finished playing audio message with id %s'
-                                     ' on device %s on site %s.',
-                                     request_id,
-                                     self.audio_out,
-                                     self.config.site)
-
-                    # Publish a message that the audio service has finished
-                    # playing the sound.
-                    # See https://docs.snips.ai/reference/hermes#being-notified-when-sound-has-finished-playing
-                    # This implementation doesn't publish a session ID.
-                    play_finished_topic = PLAY_FINISHED.format(self.config.site)
-                    play_finished_message = json.dumps({'id': request_id,
-                                                        'siteId': self.config.site})
-                    self.mqtt.publish(play_finished_topic,
-                                      play_finished_message)
-                    self.logger.debug('Published message on MQTT topic:')
-                    self.logger.debug('Topic: %s', play_finished_topic)
-                    self.logger.debug('Message: %s', play_finished_message)
-            except wave.Error as error:
-                self.logger.warning('%s', str(error))
-            except EOFError:
-                self.logger.warning('End of WAV buffer')
+                stream.write(data)
+        except queue.Empty:
+            self.logger.warning('Audio message with id %s stopped arriving.'
+                                ' Stopping playback.', playback.request_id)
+        except OSError as error:
+            # The audio device can fail or disappear while the player runs.
+            # Don't let this stop the playback thread of the audio output.
+            self.logger.warning('Can\'t play audio message with id %s on'
+                                ' device %s: %s', playback.request_id,
+                                output.name, error)
+        finally:
+            if stream is not None:
+                self.close_stream(stream)
+            elif playback.barrier:
+                # Don't let the other audio outputs wait for this one.
+                playback.barrier.abort()
+
+        self.logger.info('Finished playing audio message with id %s'
+                         ' on device %s on site %s.',
+                         playback.request_id,
+                         output.name,
+                         output.site)
+
+        if playback.finished():
+            self.publish_play_finished(playback.request_id, playback.site)
+
+    def close_stream(self, stream):
+        """Stop and close an audio output stream, even if the audio device
+        failed."""
+        try:
+            stream.stop_stream()
+        except OSError as error:
+            self.logger.warning('Can\'t stop audio output stream: %s', error)
+        self.logger.debug('Closing audio output stream...')
+        try:
+            stream.close()
+        except OSError as error:
+            self.logger.warning('Can\'t close audio output stream: %s', error)
+
+    def publish_play_finished(self, request_id, site):
+        """Publish a message that the audio service has finished playing a
+        sound, or won't play it."""
+        # See https://docs.snips.ai/reference/hermes#being-notified-when-sound-has-finished-playing
+        # This implementation doesn't publish a session ID.
+        play_finished_topic = PLAY_FINISHED.format(site)
+        play_finished_message = json.dumps({'id': request_id,
+                                            'siteId': site})
+        self.publish(play_finished_topic, play_finished_message,
+                     self.config.mqtt.qos.status)
+        self.logger.debug('Published message on MQTT topic:')
+        self.logger.debug('Topic: %s', play_finished_topic)
+        self.logger.debug('Message: %s', play_finished_message)
+
+    def synchronize(self, output, playback):
+        """Wait until all audio outputs that play a sound of a group are ready
+        to start playing it."""
+        if playback.barrier is None:
+            return
+
+        try:
+            playback.barrier.wait(STREAM_TIMEOUT)
+        except BrokenBarrierError:
+            self.logger.warning('Audio output %s plays audio message with id'
+                                ' %s of group %s without waiting for the'
+                                ' other audio outputs.', output.name,
+                                playback.request_id, playback.site)
@@ -0,0 +1,196 @@
+"""This module contains a sampling profiler to find out what the threads of
+Hermes Audio Server are doing, for instance when a device drops audio frames.
+
+The profiler is started and stopped with a signal while the audio server is
+running. The signal handlers only set a flag; all the work is done by the
+profiler thread, which is started up front and sleeps until it's needed.
+While the profiler is active, this thread periodically samples the call
+stacks of all other threads: the audio thread, the MQTT loop and the threads
+that publish queued messages or handle log records. Memory allocations are
+traced with :mod:`tracemalloc`. When it's not active, the profiler costs
+nothing.
+
+When the profiler is stopped, it writes three files:
+
+*   `<command>-<pid>-<time>.collapsed`: The sampled call stacks in the
+    collapsed format of flamegraph.pl and speedscope. Each line contains the
+    name of the thread and the functions on the stack as `module:function`,
+    separated by semicolons, followed by the number of samples.
+*   `<command>-<pid>-<time>.threads.txt`: The state and current call stack of
+    each thread.
+*   `<command>-<pid>-<time>.tracemalloc.txt`: The source lines that allocated
+    the most memory that's still in use.
+"""
+from collections import Counter
+import linecache
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+
+TOP_ALLOCATIONS = 25
+
+
+def frame_name(frame):
+    """Return the module and function of a stack frame."""
+    return '{}:{}'.format(frame.f_globals.get('__name__', '?'),
+                          frame.f_code.co_name)
+
+
+class SamplingProfiler:
+    """This class represents a sampling profiler for all threads.
+
+    Attributes:
+        command (str): The command that is profiled, used in the file names.
+        directory (:class:`pathlib.Path`): The directory where the results
+            are written.
+        interval (float): The time in seconds between two samples.
+        logger (:class:`logging.Logger`): The Logger object for logging
+            messages.
+        active (bool): Whether or not the profiler is sampling.
+    """
+
+    def __init__(self, command, directory, interval, logger):
+        """Initialize a :class:`.SamplingProfiler` object.
+
+        Args:
+            command (str): The command that is profiled.
+            directory (str): The directory where the results are written.
+            interval (float): The time in seconds between two samples.
+            logger (:class:`logging.Logger`): The Logger object for logging
+                messages.
+        """
+        self.command = command
+        self.directory = Path(directory)
+        self.interval = interval
+        self.logger = logger
+        self.active = False
+        self._wanted = False
+        self._changed = threading.Event()
+
+    def watch(self):
+        """Start the profiler thread, which waits until profiling is started
+        with :meth:`start`."""
+        threading.Thread(target=self._run, name='profiler',
+                         daemon=True).start()
+
+    def start(self):
+        """Ask the profiler thread to start profiling.
+
+        This only sets a flag for the profiler thread, so it can be called
+        from a signal handler. The profiler thread logs messages, starts
+        tracing memory allocations and writes files, which isn't safe to do in
+        a signal handler.
+        """
+        self._wanted = True
+        self._changed.set()
+
+    def stop(self):
+        """Ask the profiler thread to stop profiling and write the results.
+
+        Like :meth:`start`, this only sets a flag for the profiler thread.
+        """
+        self._wanted = False
+        self._changed.set()
+
+    def _run(self):
+        """Wait until profiling is started, profile until it's stopped and
+        start over."""
+        while True:
+            self._changed.wait()
+            self._changed.clear()
+            if self._wanted:
+                self._profile()
+
+    def _profile(self):
+        """Sample the call stacks of all threads until the profiler is
+        stopped, then write the results."""
+        # pylint: disable=protected-access
+        self.logger.info('Starting profiler with a sampling interval of %s'
+                         ' ms...', 1000 * self.interval)
+        self.active = True
+        tracemalloc.start()
+        own_id = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        started = time.monotonic()
+
+        while True:
+            if self._changed.wait(self.interval):
+                self._changed.clear()
+                if not self._wanted:
+                    break
+            names = {thread.ident: thread.name
+                     for thread in threading.enumerate()}
+            current_frames = sys._current_frames()
+            for thread_id, frame in current_frames.items():
+                if thread_id == own_id:
+                    continue
+                functions = []
+                while frame is not None:
+                    functions.append(frame_name(frame))
+                    frame = frame.f_back
+                functions.append(names.get(thread_id, str(thread_id)))
+                stacks[';'.join(reversed(functions))] += 1
+            samples += 1
+
+        duration = time.monotonic() - started
+        try:
+            self._write(stacks)
+        except OSError as error:
+            self.logger.warning('Can\'t write profile to %s: %s',
+                                self.directory, error.strerror)
+        finally:
+            tracemalloc.stop()
+            self.active = False
+        self.logger.info('Stopped profiler after %d samples in %.1f'
+                         ' seconds.', samples, duration)
+
+    def _write(self, stacks):
+        """Write the sampled call stacks, the thread states and the top memory
+        allocations."""
+        # pylint: disable=protected-access
+        prefix = self.directory / '{}-{}-{}'.format(
+            self.command, os.getpid(), time.strftime('%Y%m%d-%H%M%S'))
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Take the snapshot first and leave out the allocations of the
+        # profiler itself and of the source lines in the thread states.
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, __file__),
+             tracemalloc.Filter(False, linecache.__file__),
+             tracemalloc.Filter(False, tracemalloc.__file__)])
+        current, peak = tracemalloc.get_traced_memory()
+
+        collapsed = prefix.with_name(prefix.name + '.collapsed')
+        with collapsed.open('w') as output:
+            for stack, count in stacks.most_common():
+                output.write('{} {}\n'.format(stack, count))
+
+        threads = prefix.with_name(prefix.name + '.threads.txt')
+        frames = sys._current_frames()
+        with threads.open('w') as output:
+            for thread in threading.enumerate():
+                if thread is threading.current_thread():
+                    continue
+                output.write('Thread {} ({}, {}{}):\n'.format(
+                    thread.name, thread.ident,
+                    'alive' if thread.is_alive() else 'stopped',
+                    ', daemon' if thread.daemon else ''))
+                if thread.ident in frames:
+                    output.writelines(
+                        traceback.format_stack(frames[thread.ident]))
+                output.write('\n')
+
+        allocations = prefix.with_name(prefix.name + '.tracemalloc.txt')
+        with allocations.open('w') as output:
+            output.write('Traced memory: {} bytes, peak {} bytes\n\n'.format(
+                current, peak))
+            for statistic in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                output.write('{}\n'.format(statistic))
+
+        self.logger.info('Wrote profile to %s, %s and %s.', collapsed,
+                         threads, allocations)
@@ -2,13 +2,20 @@
 import io
 import json
 from threading import Thread
+import time
 import wave
 
 import pyaudio
 import webrtcvad
 
-from hermes_audio_server.exceptions import NoDefaultAudioDeviceError
+from hermes_audio_server.config.session import FULL, IDLE, LOCAL, MODES, \
+    VAD
+from hermes_audio_server.exceptions import UnsupportedSampleRateError
+from hermes_audio_server.logger import FrameLogSampler
 from hermes_audio_server.mqtt import MQTTClient
+from hermes_audio_server.resample import Resampler
+from hermes_audio_server.tap import AudioTap
+from hermes_audio_server.utterance import UtteranceBuffer
 
 AUDIO_FRAME = 'hermes/audioServer/{}/audioFrame'
 CHANNELS = 1
@@ -19,6 +26,12 @@ SAMPLE_WIDTH = 2
 VAD_DOWN = 'hermes/voiceActivity/{}/vadDown'
 VAD_UP = 'hermes/voiceActivity/{}/vadUp'
 
+ASR_START_LISTENING = 'hermes/asr/startListening'
+ASR_STOP_LISTENING = 'hermes/asr/stopListening'
+HOTWORD_TOGGLE_OFF = 'hermes/hotword/toggleOff'
+HOTWORD_TOGGLE_ON = 'hermes/hotword/toggleOn'
+STREAMING = 'hermes/audioServer/{}/streaming'
+
 
 # TODO: Call stream.stop_stream() and stream.close()
 class AudioRecorder(MQTTClient):
@@ -28,24 +41,98 @@ class AudioRecorder(MQTTClient):
 
     def initialize(self):
         """Initialize a Hermes audio recorder."""
-        self.logger.debug('Probing for available input devices...')
-        for index in range(self.audio.get_device_count()):
-            device = self.audio.get_device_info_by_index(index)
-            name = device['name']
-            channels = device['maxInputChannels']
-            if channels:
-                self.logger.debug('[%d] %s', index, name)
-        try:
-            self.audio_in = self.audio.get_default_input_device_info()['name']
-        except OSError:
-            raise NoDefaultAudioDeviceError('input')
+        for device in self.devices.by_direction('input'):
+            self.logger.debug('[%d] %s', device['index'], device['name'])
+
+        device = self.devices.select(self.config.audio.input, 'input')
+        self.audio_in = device['name']
+        self.audio_in_index = device['index']
+
         self.logger.info('Connected to audio input %s.', self.audio_in)
 
+        # Record at the native sample rate of the device and resample the
+        # audio if the device doesn't support 16 kHz.
+        self.capture_rate = FRAME_RATE
+        self.resampler = None
+        if not self.devices.supports_format(device, 'input', FRAME_RATE,
+                                            CHANNELS):
+            rates = self.devices.sample_rates(device, 'input')
+            if not rates:
+                raise UnsupportedSampleRateError('input', self.audio_in,
+                                                 FRAME_RATE)
+            default_rate = int(device['defaultSampleRate'])
+            if default_rate in rates:
+                self.capture_rate = default_rate
+            else:
+                self.capture_rate = max(rates)
+            self.logger.info('Audio input %s doesn\'t support %s Hz.'
+                             ' Recording at %s Hz and resampling to %s Hz.',
+                             self.audio_in, FRAME_RATE, self.capture_rate,
+                             FRAME_RATE)
+            self.resampler = Resampler(self.capture_rate, FRAME_RATE)
+
+        self.frame_log = FrameLogSampler(self.logger,
+                                         self.config.log.sample_frames,
+                                         self.config.log.summary_interval)
+        self.sequence = 0
+        self.capture_time = None
+        self.timestamp = None
+        self.frame_info_sequence = 0
+        self.in_speech = False
+        self.silence_frames = 0
+        self.utterance = None
+        self.tap = None
+
+        # The streaming mode is changed by the MQTT thread and read by the
+        # audio thread for each audio frame, so switching modes doesn't need
+        # to reopen the audio input stream.
+        self.hotword_on = True
+        self.listening = False
+        self.override = None
+        if self.config.session.enabled:
+            self.mode = self.session_mode()
+            self.logger.info('Following the dialogue session of site %s.'
+                             ' Streaming mode: %s.', self.config.site,
+                             self.mode)
+        elif self.config.vad.enabled:
+            self.mode = VAD
+        else:
+            self.mode = FULL
+        self.active_mode = self.mode
+
+        if self.config.tap.enabled:
+            self.tap = AudioTap(self.config.tap.path.format(self.config.site),
+                                self.logger)
+            try:
+                self.tap.start()
+            except OSError as error:
+                self.logger.warning('Can\'t create local audio tap %s: %s',
+                                    self.tap.path, error.strerror)
+                self.tap = None
+
+        if self.config.frame_info.enabled:
+            self.logger.info('Publishing metadata of audio frames on %s.',
+                             self.config.frame_info.topic.format(
+                                 self.config.site))
+
         if self.config.vad.enabled:
             self.logger.info('Voice Activity Detection enabled with mode %s.',
                              self.config.vad.mode)
+
+        # The dialogue session can switch to VAD even if it isn't enabled.
+        if self.config.vad.enabled or self.config.session.enabled:
             self.vad = webrtcvad.Vad(self.config.vad.mode)
 
+            if self.config.vad.utterance.enabled:
+                self.logger.info('Publishing complete voice messages of at'
+                                 ' most %s seconds on %s.',
+                                 self.config.vad.utterance.max_length,
+                                 self.config.vad.utterance.topic.format(
+                                     self.config.site))
+                self.utterance = UtteranceBuffer(
+                    self.config.vad.utterance.max_length,
+                    CHANNELS, SAMPLE_WIDTH, FRAME_RATE)
+
     def start(self):
         """Start the event loop to the MQTT broker and start the audio
         recording."""
@@ -53,6 +140,103 @@ class AudioRecorder(MQTTClient):
         Thread(target=self.send_audio_frames, daemon=True).start()
         super().start()
 
+    def on_connect(self, client, userdata, flags, result_code):
+        """Callback that is called when the audio recorder connects to the
+        MQTT broker."""
+        super().on_connect(client, userdata, flags, result_code)
+        if not self.config.session.enabled:
+            return
+
+        # Listen to the MQTT topics defined in the Hermes protocol that tell
+        # when the audio is needed, and to our own topic to override this.
+        # See https://docs.snips.ai/reference/hermes#hotword
+        # See https://docs.snips.ai/reference/hermes#asr
+        callbacks = {HOTWORD_TOGGLE_ON: self.on_hotword_toggle,
+                     HOTWORD_TOGGLE_OFF: self.on_hotword_toggle,
+                     ASR_START_LISTENING: self.on_asr_listening,
+                     ASR_STOP_LISTENING: self.on_asr_listening,
+                     STREAMING.format(self.config.site): self.on_streaming}
+        for topic, callback in callbacks.items():
+            self.mqtt.subscribe(topic, self.config.mqtt.qos.status)
+            self.mqtt.message_callback_add(topic, callback)
+            self.logger.info('Subscribed to %s topic.', topic)
+
+    def for_this_site(self, message):
+        """Check whether a Hermes message is meant for this site."""
+        try:
+            payload = json.loads(message.payload.decode('utf-8'))
+            return payload.get('siteId', 'default') == self.config.site
+        except (ValueError, AttributeError):
+            self.logger.warning('Invalid message on MQTT topic %s.',
+                                message.topic)
+            return False
+
+    def on_hotword_toggle(self, client, userdata, message):
+        """Callback that is called when hotword detection is toggled on or
+        off."""
+        if self.for_this_site(message):
+            self.hotword_on = message.topic == HOTWORD_TOGGLE_ON
+            self.update_mode()
+
+    def on_asr_listening(self, client, userdata, message):
+        """Callback that is called when the ASR starts or stops listening."""
+        if self.for_this_site(message):
+            self.listening = message.topic == ASR_START_LISTENING
+            self.update_mode()
+
+    def on_streaming(self, client, userdata, message):
+        """Callback that is called when the streaming mode is overridden.
+
+        The message is a JSON object with the key 'mode', which is one of the
+        streaming modes, or null to follow the dialogue session again.
+        """
+        try:
+            mode = json.loads(message.payload.decode('utf-8') or '{}')
+            mode = mode.get('mode')
+        except (ValueError, AttributeError):
+            mode = ''
+        if mode is not None and mode not in MODES:
+            self.logger.warning('Invalid streaming mode on MQTT topic %s.',
+                                message.topic)
+            return
+
+        self.override = mode
+        self.update_mode()
+
+    def session_mode(self):
+        """Return the streaming mode for the state of the dialogue session."""
+        if self.override is not None:
+            return self.override
+        if self.listening:
+            return self.config.session.listening
+        if self.hotword_on:
+            return self.config.session.hotword
+        return self.config.session.idle
+
+    def update_mode(self):
+        """Update the streaming mode after the state of the dialogue session
+        has changed.
+
+        The audio thread switches to the new mode at the next audio frame.
+        """
+        mode = self.session_mode()
+        if mode != self.mode:
+            self.mode = mode
+            self.logger.info('Streaming mode on site %s: %s.',
+                             self.config.site, mode)
+            if mode == LOCAL and self.tap is None:
+                self.logger.warning('There\'s no local audio tap on site %s,'
+                                    ' so no audio frames are streamed.',
+                                    self.config.site)
+
+    def stop(self):
+        """Stop the local audio tap, disconnect from the MQTT broker and
+        terminate the audio connection."""
+        if self.tap:
+            self.logger.debug('Stopping local audio tap...')
+            self.tap.stop()
+        super().stop()
+
     def publish_frames(self, frames):
         """Publish frames on MQTT."""
         with io.BytesIO() as wav_buffer:
@@ -65,10 +249,47 @@ class AudioRecorder(MQTTClient):
 
             audio_frame_topic = AUDIO_FRAME.format(self.config.site)
             audio_frame_message = wav_buffer.getvalue()
-            self.mqtt.publish(audio_frame_topic, audio_frame_message)
-            self.logger.debug('Published message on MQTT topic:')
-            self.logger.debug('Topic: %s', audio_frame_topic)
-            self.logger.debug('Message: %d bytes', len(audio_frame_message))
+            # With VAD enabled, only frames of voice messages are published,
+            # so these are worth spooling when the connection is down.
+            spool = self.active_mode == VAD
+            if self.config.frame_info.enabled:
+                self.publish_frame_info(spool)
+            self.publish(audio_frame_topic, audio_frame_message,
+                         self.config.mqtt.qos.audio_frames, spool=spool)
+            self.frame_log.published(audio_frame_topic,
+                                     len(audio_frame_message))
+
+    def publish_frame_info(self, spool):
+        """Publish the metadata of the current audio frame on MQTT.
+
+        The metadata is published just before the audio frame, with the same
+        QoS level, so consumers can match both messages. Its sequence number
+        increases by one for each published audio frame, so consumers can
+        detect lost and reordered audio frames.
+        """
+        self.frame_info_sequence += 1
+        frame_info_topic = self.config.frame_info.topic.format(
+            self.config.site)
+        frame_info_message = json.dumps({'siteId': self.config.site,
+                                         'seq': self.frame_info_sequence,
+                                         'captureTime': self.capture_time,
+                                         'timestamp': self.timestamp})
+        self.publish(frame_info_topic, frame_info_message,
+                     self.config.mqtt.qos.audio_frames, spool=spool)
+
+    def publish_utterance(self):
+        """Publish the current utterance as one WAV file on MQTT."""
+        if self.utterance is None or not len(self.utterance):
+            return
+
+        utterance_topic = self.config.vad.utterance.topic.format(
+            self.config.site)
+        utterance_message = self.utterance.wav()
+        self.publish(utterance_topic, utterance_message,
+                     self.config.mqtt.qos.audio_frames, spool=True)
+        self.logger.debug('Published message on MQTT topic:')
+        self.logger.debug('Topic: %s', utterance_topic)
+        self.logger.debug('Message: %d bytes', len(utterance_message))
 
     def publish_vad_status_message(self, message):
         """Publish a status message about the VAD on MQTT."""
@@ -76,7 +297,8 @@ class AudioRecorder(MQTTClient):
             vad_status_topic = message.format(self.config.site)
             vad_status_message = json.dumps({'siteId': self.config.site,
                                              'signalMs': 0})  # Not used
-            self.mqtt.publish(vad_status_topic, vad_status_message)
+            self.publish(vad_status_topic, vad_status_message,
+                         self.config.mqtt.qos.status, spool=True)
             self.logger.debug('Published message on MQTT topic:')
             self.logger.debug('Topic: %s', vad_status_topic)
             self.logger.debug('Message: %s', vad_status_message)
@@ -85,36 +307,119 @@ class AudioRecorder(MQTTClient):
         """Send the recorded audio frames continuously in AUDIO_FRAME
         messages on MQTT.
         """
+        # Read 20 ms of audio at a time, also at the native sample rate.
+        chunk = round(CHUNK * self.capture_rate / FRAME_RATE)
+
         self.logger.debug('Opening audio input stream...')
         stream = self.audio.open(format=pyaudio.paInt16, channels=CHANNELS,
-                                 rate=FRAME_RATE, input=True,
-                                 frames_per_buffer=CHUNK)
+                                 rate=self.capture_rate, input=True,
+                                 input_device_index=self.audio_in_index,
+                                 frames_per_buffer=chunk)
 
         self.logger.info('Starting broadcasting audio from device %s'
                          ' on site %s...', self.audio_in, self.config.site)
 
-        in_speech = False
-        silence_frames = int(FRAME_RATE / CHUNK * self.config.vad.silence)
+        # The blocking API of PortAudio doesn't tell when the audio was
+        # captured, so estimate it from the time the audio was read and the
+        # input latency of the stream. Capture times are in PortAudio stream
+        # time, timestamps are seconds since the epoch.
+        latency = stream.get_input_latency()
+        frame_size = CHUNK * SAMPLE_WIDTH * CHANNELS
+        frame_duration = CHUNK / FRAME_RATE
 
-        # TODO: Simplify if ... if ...
+        if self.resampler is None:
+            while True:
+                frames = stream.read(chunk, exception_on_overflow=False)
+                delay = latency + frame_duration
+                self.process_frames(frames, stream.get_time() - delay,
+                                    time.time() - delay)
+
+        # The resampler doesn't return exactly CHUNK samples for each chunk,
+        # so collect its output and process it in frames of CHUNK samples.
+        resampled = bytearray()
         while True:
-            frames = stream.read(CHUNK, exception_on_overflow=False)
-            if self.config.vad.enabled and self.vad.is_speech(frames, FRAME_RATE):
-                if not in_speech:
-                    in_speech = True
-                    silence_frames = int(FRAME_RATE / CHUNK * self.config.vad.silence)
-                    self.logger.info('Voice activity started on site %s.',
-                                     self.config.site)
-                    self.publish_vad_status_message(VAD_UP)
-                self.publish_frames(frames)
-            elif self.config.vad.enabled:
-                if in_speech and silence_frames > 0:
-                    self.publish_frames(frames)
-                    silence_frames -= 1
-                elif in_speech:
-                    in_speech = False
-                    self.logger.info('Voice activity stopped on site %s.',
-                                     self.config.site)
-                    self.publish_vad_status_message(VAD_DOWN)
-            else:
-                self.publish_frames(frames)
+            frames = stream.read(chunk, exception_on_overflow=False)
+            capture_time = stream.get_time() - latency
+            timestamp = time.time() - latency
+            resampled += self.resampler.process(frames)
+            while len(resampled) >= frame_size:
+                delay = len(resampled) / frame_size * frame_duration
+                self.process_frames(bytes(resampled[:frame_size]),
+                                    capture_time - delay, timestamp - delay)
+                del resampled[:frame_size]
+
+    def process_frames(self, frames, capture_time=None, timestamp=None):
+        """Send recorded audio frames to the local audio tap, run Voice
+        Activity Detection on them if it's enabled and publish the frames
+        that need to be published.
+
+        Args:
+            frames (bytes): The audio frames.
+            capture_time (float, optional): The capture time of the first
+                audio frame in PortAudio stream time. Defaults to None.
+            timestamp (float, optional): The capture time of the first audio
+                frame in seconds since the epoch. Defaults to the current
+                time.
+        """
+        self.sequence += 1
+        self.capture_time = capture_time
+        if timestamp is None:
+            timestamp = time.time()
+        self.timestamp = timestamp
+
+        mode = self.mode
+        if mode != self.active_mode:
+            self.switch_mode(mode)
+        if mode == IDLE:
+            return
+
+        if self.tap:
+            self.tap.send(self.sequence, timestamp, frames)
+
+        if mode == LOCAL:
+            return
+        if mode == FULL:
+            self.publish_frames(frames)
+        elif self.vad.is_speech(frames, FRAME_RATE):
+            if not self.in_speech:
+                self.in_speech = True
+                self.silence_frames = int(FRAME_RATE / CHUNK *
+                                          self.config.vad.silence)
+                self.logger.info('Voice activity started on site %s.',
+                                 self.config.site)
+                self.publish_vad_status_message(VAD_UP)
+            self.publish_speech_frames(frames)
+        elif self.in_speech and self.silence_frames > 0:
+            self.publish_speech_frames(frames)
+            self.silence_frames -= 1
+        elif self.in_speech:
+            self.in_speech = False
+            self.logger.info('Voice activity stopped on site %s.',
+                             self.config.site)
+            self.publish_utterance()
+            self.publish_vad_status_message(VAD_DOWN)
+
+    def switch_mode(self, mode):
+        """Switch the streaming mode of the audio thread, ending the current
+        voice message if VAD was active."""
+        if self.active_mode == VAD and self.in_speech:
+            self.in_speech = False
+            self.publish_utterance()
+            self.publish_vad_status_message(VAD_DOWN)
+        self.active_mode = mode
+
+    def publish_speech_frames(self, frames):
+        """Publish audio frames of a voice message on MQTT, or add them to the
+        current utterance if complete voice messages are published."""
+        if self.utterance is None:
+            self.publish_frames(frames)
+            return
+
+        appended = self.utterance.append(frames)
+        if self.utterance.full:
+            self.logger.info('Voice message on site %s reached the maximum'
+                             ' length of %s seconds.',
+                             self.config.site,
+                             self.config.vad.utterance.max_length)
+            self.publish_utterance()
+            self.utterance.append(frames[appended:])
@@ -0,0 +1,90 @@
+"""This module contains a resampler for 16-bit mono audio, which Hermes Audio
+Recorder uses to convert audio from microphones that don't support 16 kHz.
+
+The resampler is a polyphase FIR filter: conceptually it upsamples the audio
+by inserting zeros, filters it with a windowed-sinc low-pass filter and
+downsamples it, but it only computes the output samples that are needed. All
+output samples of a chunk are computed at once with numpy, and the last input
+samples are kept for the next chunk, so chunks can have any length without
+discontinuities.
+"""
+from math import gcd
+
+import numpy as np
+
+ZERO_CROSSINGS = 16
+ROLLOFF = 0.9
+KAISER_BETA = 8.0
+
+
+class Resampler:
+    """This class represents a streaming resampler for 16-bit mono audio.
+
+    Attributes:
+        rate_in (int): The sample rate of the input in Hz.
+        rate_out (int): The sample rate of the output in Hz.
+        up (int): The upsampling factor.
+        down (int): The downsampling factor.
+    """
+
+    def __init__(self, rate_in, rate_out):
+        """Initialize a :class:`.Resampler` object.
+
+        Args:
+            rate_in (int): The sample rate of the input in Hz.
+            rate_out (int): The sample rate of the output in Hz.
+        """
+        self.rate_in = rate_in
+        self.rate_out = rate_out
+        divisor = gcd(rate_in, rate_out)
+        self.up = rate_out // divisor
+        self.down = rate_in // divisor
+
+        # Design a windowed-sinc low-pass filter at the upsampled rate, with
+        # its cutoff just below the lowest of both Nyquist frequencies.
+        factor = max(self.up, self.down)
+        n_taps = 2 * ZERO_CROSSINGS * factor + 1
+        time = np.arange(n_taps) - (n_taps - 1) / 2
+        taps = ROLLOFF / factor * np.sinc(ROLLOFF * time / factor)
+        taps *= np.kaiser(n_taps, KAISER_BETA) * self.up
+
+        # Split the filter in phases: phase p contains the taps p, p + up,
+        # p + 2 * up, ... which are applied to consecutive input samples,
+        # newest first.
+        self.taps_per_phase = -(-n_taps // self.up)
+        padded = np.zeros(self.taps_per_phase * self.up)
+        padded[:n_taps] = taps
+        self._phases = padded.reshape(self.taps_per_phase,
+                                      self.up).T.astype(np.float32)
+
+        self._offsets = np.arange(self.taps_per_phase)
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        # Position of the next output sample in the upsampled signal, relative
+        # to the first sample of the next chunk.
+        self._position = 0
+
+    def process(self, frames):
+        """Resample a chunk of audio.
+
+        Args:
+            frames (bytes): 16-bit little-endian mono audio at the input rate.
+
+        Returns:
+            bytes: 16-bit little-endian mono audio at the output rate. Its
+            length varies slightly from chunk to chunk.
+        """
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32)
+        buffer = np.concatenate((self._history, samples))
+        n_in = len(samples)
+
+        n_out = max(0, -(-(n_in * self.up - self._position) // self.down))
+        positions = self._position + np.arange(n_out) * self.down
+        newest = positions // self.up + len(self._history)
+        indices = newest[:, np.newaxis] - self._offsets
+        phases = self._phases[positions % self.up]
+        output = np.einsum('ij,ij->i', buffer[indices], phases)
+
+        self._position += n_out * self.down - n_in * self.up
+        self._history = buffer[len(buffer) - len(self._history):]
+
+        return np.clip(np.rint(output), -32768, 32767).astype('<i2').tobytes()
@@ -0,0 +1,265 @@
+"""This module contains the queues where Hermes Audio Server keeps the MQTT
+messages it publishes while the connection to the MQTT broker is down.
+
+Both queues have a fixed maximum size, so the memory and disk use of the
+audio server stay flat during a long outage. Messages in the spool file also
+have a maximum age, so audio that was recorded long ago, for instance before
+the audio server was restarted, isn't published anymore.
+"""
+from collections import deque
+from pathlib import Path
+import struct
+from threading import Lock
+import time
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+# Time, QoS, length of the topic, length of the payload
+RECORD_HEADER = struct.Struct('!dBHI')
+
+
+def _to_bytes(payload):
+    """Convert an MQTT payload to bytes."""
+    if isinstance(payload, str):
+        return payload.encode('utf-8')
+    return bytes(payload)
+
+
+class MessageQueue:
+    """This class represents an in-memory queue of MQTT messages with a maximum
+    size in bytes.
+
+    Attributes:
+        max_bytes (int): The maximum size in bytes of the queued payloads.
+        overflow (str): What to do when the queue is full: 'drop_oldest' or
+            'drop_newest'.
+        size (int): The current size in bytes of the queued payloads.
+        dropped (int): The number of messages dropped because the queue was
+            full.
+    """
+
+    def __init__(self, max_bytes, overflow=DROP_OLDEST):
+        """Initialize a :class:`.MessageQueue` object.
+
+        Args:
+            max_bytes (int): The maximum size in bytes of the queued payloads.
+            overflow (str, optional): What to do when the queue is full:
+                'drop_oldest' or 'drop_newest'. Defaults to 'drop_oldest'.
+        """
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.size = 0
+        self.dropped = 0
+        self._messages = deque()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def put(self, topic, payload, qos=0):
+        """Add a message to the queue.
+
+        Args:
+            topic (str): The MQTT topic.
+            payload (bytes or str): The payload of the message.
+            qos (int, optional): The QoS level. Defaults to 0.
+
+        Returns:
+            bool: False if the message was dropped because the queue was full.
+        """
+        payload = _to_bytes(payload)
+        if len(payload) > self.max_bytes:
+            self.dropped += 1
+            return False
+
+        while self.size + len(payload) > self.max_bytes:
+            if self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return False
+            _, dropped_payload, _ = self._messages.popleft()
+            self.size -= len(dropped_payload)
+            self.dropped += 1
+
+        self._messages.append((topic, payload, qos))
+        self.size += len(payload)
+        return True
+
+    def pop(self):
+        """Remove the oldest message from the queue.
+
+        Returns:
+            tuple: The topic, payload and QoS level of the message, or `None`
+            if the queue is empty.
+        """
+        if not self._messages:
+            return None
+
+        message = self._messages.popleft()
+        self.size -= len(message[1])
+        return message
+
+    def requeue(self, message):
+        """Put a message that couldn't be published back at the front of the
+        queue.
+
+        Args:
+            message (tuple): The topic, payload and QoS level of the message,
+                as returned by :meth:`pop`.
+        """
+        self._messages.appendleft(message)
+        self.size += len(message[1])
+
+
+class SpoolFile:
+    """This class represents a queue of MQTT messages in a file with a maximum
+    size in bytes.
+
+    Messages are appended to the file as records with a small header. They're
+    read back in the same order, and the file is truncated as soon as all
+    messages have been read. Messages older than :attr:`max_age` are skipped
+    when they're read back.
+
+    Attributes:
+        path (:class:`pathlib.Path`): The path of the spool file.
+        max_bytes (int): The maximum size in bytes of the spool file.
+        max_age (float): The maximum age in seconds of a message that's read
+            back.
+        dropped (int): The number of messages dropped because the spool file
+            was full.
+        expired (int): The number of messages skipped because they were older
+            than :attr:`max_age`.
+        recovered (int): The number of messages that were in the spool file
+            from a previous run.
+        messages (int): The number of messages that haven't been read yet.
+    """
+
+    def __init__(self, path, max_bytes, max_age):
+        """Initialize a :class:`.SpoolFile` object.
+
+        Messages that are still in the spool file from a previous run are kept
+        and will be read back first, unless they're too old by then.
+
+        Args:
+            path (str): The path of the spool file.
+            max_bytes (int): The maximum size in bytes of the spool file.
+            max_age (float): The maximum age in seconds of a message that's
+                read back.
+
+        Raises:
+            :exc:`OSError`: If the spool file can't be opened.
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.dropped = 0
+        self.expired = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open('a+b')
+        self._file.seek(0, 2)
+        self._size = self._file.tell()
+        self._offset = 0
+        self._previous_offset = 0
+        self._lock = Lock()
+        self.recovered = self._count()
+        self.messages = self.recovered
+
+    def __len__(self):
+        """Return the number of bytes in the spool file that are not read yet.
+        """
+        return self._size - self._offset
+
+    def append(self, topic, payload, qos=0):
+        """Append a message to the spool file.
+
+        Args:
+            topic (str): The MQTT topic.
+            payload (bytes or str): The payload of the message.
+            qos (int, optional): The QoS level. Defaults to 0.
+
+        Returns:
+            bool: False if the message was dropped because the spool file was
+            full.
+        """
+        topic = topic.encode('utf-8')
+        payload = _to_bytes(payload)
+        record_size = RECORD_HEADER.size + len(topic) + len(payload)
+
+        with self._lock:
+            if self._size + record_size > self.max_bytes:
+                self.dropped += 1
+                return False
+
+            self._file.write(RECORD_HEADER.pack(time.time(), qos, len(topic),
+                                                len(payload)))
+            self._file.write(topic)
+            self._file.write(payload)
+            self._file.flush()
+            self._size += record_size
+            self.messages += 1
+
+        return True
+
+    def _count(self):
+        """Count the complete records in the spool file."""
+        count = 0
+        offset = 0
+        while offset + RECORD_HEADER.size <= self._size:
+            self._file.seek(offset)
+            _, _, topic_length, payload_length = RECORD_HEADER.unpack(
+                self._file.read(RECORD_HEADER.size))
+            offset += RECORD_HEADER.size + topic_length + payload_length
+            if offset > self._size:
+                break
+            count += 1
+        self._file.seek(0, 2)
+        return count
+
+    def pop(self):
+        """Read the oldest message that hasn't been read yet and isn't too old
+        from the spool file.
+
+        Returns:
+            tuple: The topic, payload and QoS level of the message, or `None`
+            if all messages have been read.
+        """
+        with self._lock:
+            while self._offset < self._size:
+                self._file.seek(self._offset)
+                header = self._file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                created, qos, topic_length, payload_length = \
+                    RECORD_HEADER.unpack(header)
+                topic = self._file.read(topic_length)
+                payload = self._file.read(payload_length)
+                if len(topic) < topic_length or len(payload) < payload_length:
+                    # The last record is incomplete, for instance because the
+                    # audio server was killed while writing it.
+                    break
+
+                self._previous_offset = self._offset
+                self._offset = self._file.tell()
+                self.messages -= 1
+                if time.time() - created > self.max_age:
+                    self.expired += 1
+                    continue
+                return topic.decode('utf-8'), payload, qos
+
+            self._file.truncate(0)
+            self._size = 0
+            self._offset = 0
+            self._previous_offset = 0
+            self.messages = 0
+            return None
+
+    def requeue(self):
+        """Read the last message returned by :meth:`pop` again the next time,
+        because it couldn't be published."""
+        with self._lock:
+            self._offset = self._previous_offset
+            self.messages += 1
+
+    def close(self):
+        """Close the spool file."""
+        with self._lock:
+            self._file.close()
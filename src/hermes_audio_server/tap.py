@@ -0,0 +1,176 @@
+"""This module contains a local audio tap: a Unix domain socket that streams
+the raw audio frames of Hermes Audio Recorder to other programs on the same
+host, such as a wake word detector, without going through the MQTT broker.
+
+Each audio frame is sent as a header followed by the raw PCM data (16 kHz,
+mono, 16-bit little-endian). The header contains the sequence number of the
+frame, its capture time (seconds since the epoch) and the length of the PCM
+data in bytes. A consumer that can't keep up misses frames, which it can see
+from gaps in the sequence numbers.
+"""
+import os
+from pathlib import Path
+import socket
+import struct
+from threading import Lock, Thread
+
+# Sequence number, capture time, length of the PCM data
+FRAME_HEADER = struct.Struct('!QdI')
+BACKLOG = 5
+
+
+class AudioTap:
+    """This class represents a Unix domain socket that streams audio frames to
+    local consumers.
+
+    Attributes:
+        path (:class:`pathlib.Path`): The path of the Unix domain socket.
+        dropped (int): The number of frames that couldn't be sent to a
+            consumer because it didn't keep up.
+    """
+
+    def __init__(self, path, logger):
+        """Initialize an :class:`.AudioTap` object.
+
+        Args:
+            path (str): The path of the Unix domain socket.
+            logger (:class:`logging.Logger`): The Logger object for logging
+                messages.
+        """
+        self.path = Path(path)
+        self.logger = logger
+        self.dropped = 0
+        self._clients = []
+        self._lock = Lock()
+        self._server = None
+
+    def start(self):
+        """Start listening for consumers on the Unix domain socket.
+
+        Raises:
+            :exc:`OSError`: If the Unix domain socket can't be created.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.is_socket():
+            self.path.unlink()
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(str(self.path))
+        self._server.listen(BACKLOG)
+        Thread(target=self._accept, daemon=True).start()
+        self.logger.info('Streaming audio frames on local socket %s.',
+                         self.path)
+
+    def _accept(self):
+        """Accept consumers until the Unix domain socket is closed."""
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            client.setblocking(False)
+            with self._lock:
+                self._clients.append(client)
+            self.logger.debug('Local consumer connected to %s.', self.path)
+
+    def send(self, sequence, timestamp, frames):
+        """Send an audio frame to all consumers.
+
+        This never blocks. If a consumer's socket buffer is full, the frame
+        is skipped for that consumer. A consumer that only received part of a
+        frame is disconnected, because its stream can't be parsed anymore.
+
+        Args:
+            sequence (int): The sequence number of the frame.
+            timestamp (float): The capture time of the frame.
+            frames (bytes): The raw PCM data.
+        """
+        header = FRAME_HEADER.pack(sequence, timestamp, len(frames))
+        size = len(header) + len(frames)
+
+        with self._lock:
+            clients = self._clients
+            if not clients:
+                return
+
+            for client in list(clients):
+                try:
+                    sent = client.sendmsg([header, frames])
+                except BlockingIOError:
+                    self.dropped += 1
+                    continue
+                except OSError:
+                    sent = 0
+
+                if sent != size:
+                    self.logger.debug('Local consumer disconnected from %s.',
+                                      self.path)
+                    clients.remove(client)
+                    client.close()
+
+    def stop(self):
+        """Stop streaming and remove the Unix domain socket."""
+        if self._server is None:
+            return
+
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        try:
+            os.unlink(str(self.path))
+        except OSError:
+            pass
+
+
+class TapReader:
+    """This class reads audio frames from the local audio tap of Hermes Audio
+    Recorder.
+
+    The PCM data is read into a buffer that's reused for each frame, so it's
+    only valid until the next frame is read.
+
+    Example:
+
+        for sequence, timestamp, frames in TapReader(path):
+            detector.process(frames)
+    """
+
+    def __init__(self, path):
+        """Connect to the local audio tap.
+
+        Args:
+            path (str): The path of the Unix domain socket.
+        """
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(str(path))
+        self._header = bytearray(FRAME_HEADER.size)
+        self._buffer = bytearray()
+
+    def _read_into(self, view):
+        """Fill a buffer with data from the socket."""
+        while view:
+            n_bytes = self.socket.recv_into(view)
+            if not n_bytes:
+                raise EOFError('Local audio tap closed')
+            view = view[n_bytes:]
+
+    def __iter__(self):
+        """Yield the sequence number, capture time and PCM data of each
+        frame until the audio tap is closed."""
+        try:
+            while True:
+                self._read_into(memoryview(self._header))
+                sequence, timestamp, length = FRAME_HEADER.unpack(self._header)
+                if len(self._buffer) < length:
+                    self._buffer = bytearray(length)
+                frames = memoryview(self._buffer)[:length]
+                self._read_into(frames)
+                yield sequence, timestamp, frames
+        except EOFError:
+            return
+
+    def close(self):
+        """Disconnect from the local audio tap."""
+        self.socket.close()
@@ -0,0 +1,116 @@
+"""This module contains a buffer that collects the audio frames of a voice
+message, so Hermes Audio Recorder can publish it as one WAV file.
+"""
+import struct
+
+WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+INITIAL_LENGTH = 5  # seconds
+
+
+def wav_header(n_bytes, channels, sample_width, frame_rate):
+    """Return the header of a PCM WAV file.
+
+    Args:
+        n_bytes (int): The number of bytes of audio data.
+        channels (int): The number of channels.
+        sample_width (int): The number of bytes per sample.
+        frame_rate (int): The sample rate in Hz.
+
+    Returns:
+        bytes: The 44 bytes long WAV header.
+    """
+    block_align = channels * sample_width
+    return WAV_HEADER.pack(b'RIFF', 36 + n_bytes, b'WAVE',
+                           b'fmt ', 16, 1, channels, frame_rate,
+                           frame_rate * block_align, block_align,
+                           sample_width * 8,
+                           b'data', n_bytes)
+
+
+class UtteranceBuffer:
+    """This class represents a buffer with the audio frames of a voice message.
+
+    The buffer is allocated once with room for the WAV header and a few
+    seconds of audio, and grows by doubling its size up to the maximum length
+    of a voice message. Audio frames are copied into it in place, and the WAV
+    header is filled in when the voice message is complete, so publishing a
+    voice message doesn't need another encoding step.
+
+    Attributes:
+        channels (int): The number of channels.
+        sample_width (int): The number of bytes per sample.
+        frame_rate (int): The sample rate in Hz.
+        max_bytes (int): The maximum number of bytes of audio data.
+    """
+
+    def __init__(self, max_length, channels, sample_width, frame_rate):
+        """Initialize an :class:`.UtteranceBuffer` object.
+
+        Args:
+            max_length (int): The maximum length in seconds of a voice message.
+            channels (int): The number of channels.
+            sample_width (int): The number of bytes per sample.
+            frame_rate (int): The sample rate in Hz.
+        """
+        self.channels = channels
+        self.sample_width = sample_width
+        self.frame_rate = frame_rate
+        bytes_per_second = channels * sample_width * frame_rate
+        self.max_bytes = int(max_length * bytes_per_second)
+        initial_bytes = min(INITIAL_LENGTH * bytes_per_second, self.max_bytes)
+        self._buffer = bytearray(WAV_HEADER.size + initial_bytes)
+        self._length = 0
+
+    def __len__(self):
+        """Return the number of bytes of audio data in the buffer."""
+        return self._length
+
+    @property
+    def full(self):
+        """Check whether the buffer has reached the maximum length.
+
+        Returns:
+            bool: True if no more audio data fits in the buffer.
+        """
+        return self._length >= self.max_bytes
+
+    def append(self, frames):
+        """Append audio frames to the buffer.
+
+        Args:
+            frames (bytes): The audio frames.
+
+        Returns:
+            int: The number of bytes appended. This is less than the length of
+            :attr:`frames` if the buffer has reached its maximum length.
+        """
+        n_bytes = min(len(frames), self.max_bytes - self._length)
+        start = WAV_HEADER.size + self._length
+        end = start + n_bytes
+
+        if end > len(self._buffer):
+            capacity = len(self._buffer) - WAV_HEADER.size
+            while WAV_HEADER.size + capacity < end:
+                capacity *= 2
+            capacity = min(capacity, self.max_bytes)
+            self._buffer.extend(bytes(WAV_HEADER.size + capacity -
+                                      len(self._buffer)))
+
+        self._buffer[start:end] = memoryview(frames)[:n_bytes]
+        self._length += n_bytes
+        return n_bytes
+
+    def wav(self):
+        """Return the audio data in the buffer as a WAV file and empty the
+        buffer.
+
+        Returns:
+            bytes: The WAV file.
+        """
+        self._buffer[:WAV_HEADER.size] = wav_header(self._length,
+                                                    self.channels,
+                                                    self.sample_width,
+                                                    self.frame_rate)
+        wav = bytes(memoryview(self._buffer)[:WAV_HEADER.size + self._length])
+        self._length = 0
+        return wav
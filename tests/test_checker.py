@@ -0,0 +1,43 @@
+"""Tests for the audio frame checker of Hermes Audio Server."""
+import statistics
+
+from hermes_audio_server.checker import FrameChecker, SEQUENCE_WINDOW
+
+
+def test_counts():
+    """Lost, duplicate and reordered metadata messages are counted."""
+    checker = FrameChecker()
+    for sequence in (0, 1, 3, 2, 2, 5):
+        checker.frame()
+        checker.info({'seq': sequence}, 0)
+
+    assert checker.expected == 6
+    assert checker.duplicates == 1
+    assert checker.reordered == 1
+    assert checker.lost_infos == 1
+
+
+def test_bounded_memory():
+    """Old sequence numbers are forgotten, but still counted."""
+    checker = FrameChecker()
+    for sequence in range(3 * SEQUENCE_WINDOW):
+        checker.info({'seq': sequence}, 0)
+    checker.info({'seq': 3 * SEQUENCE_WINDOW - 1}, 0)
+
+    assert len(checker._sequences) <= SEQUENCE_WINDOW  # pylint: disable=protected-access
+    assert checker.duplicates == 1
+    assert checker.lost_infos == 0
+
+
+def test_running_statistics():
+    """The delays are summarized without storing them."""
+    checker = FrameChecker()
+    delays = [0.010, 0.030, 0.020, 0.050, 0.015]
+    for sequence, delay in enumerate(delays):
+        checker.info({'seq': sequence, 'timestamp': 100},
+                     100 + delay)
+
+    assert abs(checker.latencies.mean - statistics.mean(delays)) < 1e-9
+    assert abs(checker.latencies.stddev - statistics.stdev(delays)) < 1e-9
+    assert abs(checker.latencies.minimum - 0.010) < 1e-9
+    assert abs(checker.latencies.maximum - 0.050) < 1e-9
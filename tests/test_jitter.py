@@ -0,0 +1,49 @@
+"""Tests for the jitter buffer of Hermes Audio Player."""
+import queue
+
+import pytest
+
+from hermes_audio_server.jitter import JitterBuffer
+
+CHUNK = bytes(16000)
+
+
+def test_cap_holds_for_in_order_chunks():
+    """Chunks that arrive in order don't grow the buffer beyond its maximum
+    size when nothing is playing."""
+    buffer = JitterBuffer(prebuffer=len(CHUNK), max_size=10 * len(CHUNK))
+
+    accepted = [buffer.put(index, CHUNK) for index in range(600)]
+
+    assert accepted.count(True) == 10
+    assert buffer.size <= buffer.max_size
+
+
+def test_dropped_chunk_is_skipped():
+    """Playback skips a chunk that was dropped because the buffer was full,
+    instead of waiting for it."""
+    buffer = JitterBuffer(prebuffer=0, max_size=2 * len(CHUNK))
+
+    assert buffer.put(0, b'\x00' * 10)
+    assert buffer.put(1, CHUNK)
+    assert not buffer.put(2, CHUNK)
+    assert buffer.get(0) == b'\x00' * 10
+    assert buffer.put(3, b'\x03' * 10, last=True)
+
+    assert buffer.get(0) == CHUNK
+    assert buffer.get(0) == b'\x03' * 10
+    assert buffer.get(0) is None
+
+
+def test_missing_chunk_is_accepted_when_full():
+    """The chunk that playback is waiting for is accepted even if
+    out-of-order chunks fill the buffer."""
+    buffer = JitterBuffer(prebuffer=0, max_size=2 * len(CHUNK))
+
+    assert buffer.put(1, CHUNK)
+    assert buffer.put(2, CHUNK)
+    with pytest.raises(queue.Empty):
+        buffer.get(0)
+
+    assert buffer.put(0, CHUNK)
+    assert buffer.get(0) == CHUNK
@@ -0,0 +1,86 @@
+"""Tests for the audio player of Hermes Audio Server."""
+import logging
+
+import pytest
+
+pytest.importorskip('pyaudio')
+
+# pylint: disable=wrong-import-position
+from hermes_audio_server.player import AudioOutput, AudioPlayer, Playback
+
+
+class FailingStream:
+    """An output stream of an audio device that fails while playing."""
+
+    def __init__(self):
+        self.closed = False
+
+    @staticmethod
+    def write(data):
+        """Fail to play audio frames."""
+        raise OSError(-9999, 'Unanticipated host error')
+
+    @staticmethod
+    def stop_stream():
+        """Fail to stop the stream."""
+        raise OSError(-9999, 'Unanticipated host error')
+
+    def close(self):
+        """Close the stream."""
+        self.closed = True
+
+
+class FailingAudio:
+    """A PyAudio object of which the first stream can't be opened."""
+
+    def __init__(self):
+        self.streams = []
+
+    def open(self, **kwargs):
+        """Open an output stream."""
+        # pylint: disable=unused-argument
+        if not self.streams:
+            self.streams.append(None)
+            raise OSError(-9996, 'Invalid output device')
+        stream = FailingStream()
+        self.streams.append(stream)
+        return stream
+
+
+def player():
+    """Return an audio player that records the sounds it has finished."""
+    audio_player = AudioPlayer.__new__(AudioPlayer)
+    audio_player.logger = logging.getLogger('test')
+    audio_player.audio = FailingAudio()
+    audio_player.finished = []
+    audio_player.publish_play_finished = \
+        lambda request_id, site: audio_player.finished.append(request_id)
+    return audio_player
+
+
+def test_audio_device_errors():
+    """Errors of the audio device stop the sound but not the player, and
+    the sound is reported as finished."""
+    audio_player = player()
+    output = AudioOutput('kitchen', {'name': 'speaker', 'index': 0})
+
+    audio_player.play(output, Playback('1', 'kitchen', 1), 8, 1, 16000,
+                      [bytes(320)])
+    audio_player.play(output, Playback('2', 'kitchen', 1), 8, 1, 16000,
+                      [bytes(320)])
+
+    assert audio_player.finished == ['1', '2']
+    assert audio_player.audio.streams[1].closed
+
+
+def test_group_doesnt_wait_for_failed_output():
+    """An audio output that can't open its stream lets the other audio
+    outputs of a group start right away."""
+    audio_player = player()
+    output = AudioOutput('kitchen', {'name': 'speaker', 'index': 0})
+    playback = Playback('1', 'downstairs', 2)
+
+    audio_player.play(output, playback, 8, 1, 16000, [bytes(320)])
+
+    assert playback.barrier.broken
+    assert audio_player.finished == []
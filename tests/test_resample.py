@@ -0,0 +1,49 @@
+"""Tests for the resampler of Hermes Audio Recorder."""
+import numpy as np
+
+from hermes_audio_server.resample import Resampler
+
+
+def tone(frequency, rate, length=1):
+    """Return a sine wave as 16-bit audio."""
+    time = np.arange(int(length * rate)) / rate
+    return (10000 * np.sin(2 * np.pi * frequency * time)).astype('<i2')
+
+
+def resample(rate_in, samples, chunk=480):
+    """Resample audio in chunks and return the output samples."""
+    resampler = Resampler(rate_in, 16000)
+    frames = samples.tobytes()
+    output = b''.join(resampler.process(frames[start:start + 2 * chunk])
+                      for start in range(0, len(frames), 2 * chunk))
+    return np.frombuffer(output, dtype='<i2').astype(np.float64)
+
+
+def amplitude(samples):
+    """Return the peak amplitude of audio after the filter has settled."""
+    return np.abs(samples[len(samples) // 4:]).max()
+
+
+def test_output_length():
+    """The output has the length of the input at the output rate, regardless
+    of the chunk size."""
+    for rate in (8000, 22050, 44100, 48000):
+        for chunk in (100, 441, 1024):
+            output = resample(rate, tone(440, rate), chunk)
+            assert abs(len(output) - 16000) <= 1
+
+
+def test_passband():
+    """Tones below the cutoff keep their amplitude."""
+    for rate in (44100, 48000):
+        for frequency in (440, 3000, 6000):
+            output = resample(rate, tone(frequency, rate))
+            assert 9500 < amplitude(output) < 10500
+
+
+def test_stopband():
+    """Tones above the Nyquist frequency of the output are removed instead of
+    aliased."""
+    for rate in (44100, 48000):
+        output = resample(rate, tone(12000, rate))
+        assert amplitude(output) < 100
@@ -0,0 +1,84 @@
+"""Tests for the message queues of Hermes Audio Server."""
+import time
+
+from hermes_audio_server.spool import MessageQueue, SpoolFile
+
+
+def test_spool_round_trip(tmp_path):
+    """Messages are read back from the spool file in order, also after it
+    has been reopened."""
+    spool = SpoolFile(tmp_path / 'audio.spool', 1024, 60)
+    assert spool.append('topic/a', b'first', 1)
+    assert spool.append('topic/b', 'second')
+    spool.close()
+
+    spool = SpoolFile(tmp_path / 'audio.spool', 1024, 60)
+    assert spool.recovered == 2
+    assert spool.pop() == ('topic/a', b'first', 1)
+    assert spool.pop() == ('topic/b', b'second', 0)
+    assert spool.pop() is None
+    assert spool.messages == 0
+
+
+def test_spool_is_full(tmp_path):
+    """Messages that don't fit in the spool file are dropped."""
+    spool = SpoolFile(tmp_path / 'audio.spool', 64, 60)
+    assert spool.append('topic', bytes(32))
+    assert not spool.append('topic', bytes(32))
+    assert spool.dropped == 1
+
+
+def test_spool_requeue(tmp_path):
+    """A message that couldn't be published is read again."""
+    spool = SpoolFile(tmp_path / 'audio.spool', 1024, 60)
+    spool.append('topic', b'first')
+    spool.append('topic', b'second')
+
+    assert spool.pop() == ('topic', b'first', 0)
+    spool.requeue()
+    assert spool.messages == 2
+    assert spool.pop() == ('topic', b'first', 0)
+    assert spool.pop() == ('topic', b'second', 0)
+
+
+def test_spool_expiry(tmp_path):
+    """Messages older than the maximum age are skipped."""
+    spool = SpoolFile(tmp_path / 'audio.spool', 1024, 0.05)
+    spool.append('topic', b'old')
+    time.sleep(0.1)
+    spool.append('topic', b'new')
+
+    assert spool.pop() == ('topic', b'new', 0)
+    assert spool.expired == 1
+    assert spool.pop() is None
+
+
+def test_spool_incomplete_record(tmp_path):
+    """An incomplete record at the end of the spool file is discarded."""
+    path = tmp_path / 'audio.spool'
+    spool = SpoolFile(path, 1024, 60)
+    spool.append('topic', b'complete')
+    spool.close()
+    with path.open('ab') as spool_file:
+        spool_file.write(b'\x00\x01')
+
+    spool = SpoolFile(path, 1024, 60)
+    assert spool.recovered == 1
+    assert spool.pop() == ('topic', b'complete', 0)
+    assert spool.pop() is None
+
+
+def test_queue_overflow():
+    """The in-memory queue drops the oldest or the newest messages when it's
+    full."""
+    queue = MessageQueue(10, 'drop_oldest')
+    for payload in (b'12345', b'67890', b'abcde'):
+        queue.put('topic', payload)
+    assert queue.pop() == ('topic', b'67890', 0)
+    assert queue.dropped == 1
+
+    queue = MessageQueue(10, 'drop_newest')
+    for payload in (b'12345', b'67890', b'abcde'):
+        queue.put('topic', payload)
+    assert queue.pop() == ('topic', b'12345', 0)
+    assert queue.dropped == 1
@@ -0,0 +1,49 @@
+"""Tests for the buffer with the audio frames of a voice message."""
+import io
+import wave
+
+from hermes_audio_server.utterance import INITIAL_LENGTH, UtteranceBuffer
+
+FRAME_RATE = 16000
+
+
+def test_buffer_grows():
+    """The buffer grows beyond its initial size up to the maximum length."""
+    buffer = UtteranceBuffer(20, 1, 2, FRAME_RATE)
+    frames = bytes(range(256)) * 125  # 1 second
+
+    for _ in range(INITIAL_LENGTH + 3):
+        assert buffer.append(frames) == len(frames)
+
+    assert len(buffer) == (INITIAL_LENGTH + 3) * len(frames)
+    assert not buffer.full
+
+
+def test_buffer_splits_at_maximum_length():
+    """Audio frames beyond the maximum length aren't appended, so the caller
+    can put them in the next voice message."""
+    buffer = UtteranceBuffer(1, 1, 2, FRAME_RATE)
+    frames = bytes(640)
+
+    appended = [buffer.append(frames) for _ in range(51)]
+
+    assert appended[:50] == [640] * 50
+    assert appended[50] == 0
+    assert buffer.full
+
+
+def test_wav():
+    """The buffer returns a valid WAV file with the appended audio frames and
+    is empty afterwards."""
+    buffer = UtteranceBuffer(10, 1, 2, FRAME_RATE)
+    frames = bytes(range(256)) * 5
+    buffer.append(frames)
+    buffer.append(frames)
+
+    with wave.open(io.BytesIO(buffer.wav()), 'rb') as wav:
+        assert wav.getnchannels() == 1
+        assert wav.getsampwidth() == 2
+        assert wav.getframerate() == FRAME_RATE
+        assert wav.readframes(wav.getnframes()) == frames + frames
+
+    assert not buffer